@@ -0,0 +1,62 @@
+"""
+many interactive programs on one asyncio loop: every session reads ROUNDS numbers with input()
+and prints a running total, while a simulated user per session answers after a short delay.
+usage: python bench_sessions.py [sessions]
+"""
+import asyncio
+import sys
+import time
+import tracemalloc
+
+import interpreter
+
+ROUNDS = 20
+SOURCE = f'''total = 0
+for i = 0 to {ROUNDS}
+    n = int(input("number? "))
+    total = total + n
+    print("running total", total)
+next i
+print("done", total)'''
+
+
+async def user(session: interpreter.Session, answers: asyncio.Queue) -> int:
+    """plays the person at the keyboard: types 1 to ROUNDS, then checks the final output"""
+    received = []
+
+    async def read_line():
+        await asyncio.sleep(0.001) # typing
+        return await answers.get()
+
+    async def write(text):
+        received.append(text)
+
+    for i in range(1, ROUNDS + 1):
+        answers.put_nowait(str(i))
+    await session.run(read_line, write)
+    assert received[-1].endswith(f"'done' {ROUNDS * (ROUNDS + 1) // 2}\n"), received[-1]
+    return len(received)
+
+
+async def main(count: int) -> None:
+    program = interpreter.Parser().produce_ast(SOURCE)
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    sessions = [interpreter.Session(program) for _ in range(count)]
+    for session in sessions: # everyone sitting at their first input()
+        session.resume()
+    waiting = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{count} sessions waiting for input: {(waiting - before) / count / 1024:.1f} KiB each")
+
+    sessions = [interpreter.Session(program) for _ in range(count)]
+    start = time.perf_counter()
+    await asyncio.gather(*(user(session, asyncio.Queue()) for session in sessions))
+    end = time.perf_counter()
+    print(f"{count} sessions x {ROUNDS} inputs on one thread: {end - start:.2f}s, "
+          f"{count * ROUNDS / (end - start):.0f} inputs/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
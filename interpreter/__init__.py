@@ -1,10 +1,44 @@
+import time as _time
+_IMPORT_STARTED = _time.perf_counter()
+
 from .ast import *
 from .values import *
 from .blocks import *
 from .environment import Environment
+from .streams import Streams
+from .native import NativeFunction, native, register_native, load_extension, get_native_modules
 from .utils import *
 from .interpreter import *
-from .lexer import Lexer
-from .parser import Parser
 from .default_modules import get_default_modules
 from .run import *
+
+# loaded on first use: the parser is not needed to run a program parsed already,
+# nor asyncio to run one outside of a Session
+LAZY = {
+    "Lexer": ".lexer",
+    "Parser": ".parser",
+    "Memoizer": ".memo",
+    "DEFAULT_MEMO_SIZE": ".memo",
+    "import_module": ".modules",
+    "load_module": ".modules",
+    "Session": ".suspend",
+    "run_program": ".suspend",
+    "compile": ".compiled",
+    "CompiledProgram": ".compiled",
+}
+
+
+def __getattr__(name: str):
+    if name not in LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(LAZY))
+
+
+IMPORT_TIME = _time.perf_counter() - _IMPORT_STARTED
@@ -12,12 +12,16 @@ class NodeType:
             'IfBlock',
             'IfStatement',
             'ForBlock',
+            'ForEachBlock',
             'FuncBlock',
             'WhileBlock',
+            'SwitchBlock',
+            'CaseBlock',
             'NumericLiteral',
             'AssignmentExpr',
             'ArrayAssignmentExpr',
             'ListExpression',
+            'DictExpression',
             'FunctionCall',
             'Identifier',
             'ArrayIndex',
@@ -27,6 +31,10 @@ class NodeType:
             'CallExpr',
             'FunctionDeclaration',
             'StringLiteral',
+            'BreakStatement',
+            'ContinueStatement',
+            'ReturnStatement',
+            'ImportStatement',
         )
 
         if node_type in available_types:
@@ -62,6 +70,44 @@ class Program(Statement):
         return 'Program'
 
 
+class BreakStatement(Statement):
+    def __init__(self) -> None:
+        super().__init__()
+        self.node_type = NodeType('BreakStatement')
+
+
+class ContinueStatement(Statement):
+    def __init__(self) -> None:
+        super().__init__()
+        self.node_type = NodeType('ContinueStatement')
+
+
+class ReturnStatement(Statement):
+    def __init__(self, value=None) -> None:
+        super().__init__()
+        self.node_type = NodeType('ReturnStatement')
+        self.value = value # Expression, None for a bare return
+
+    def fields(self) -> dict:
+        return {
+            'type': self.node_type.node_type,
+            'value': self.value
+        }
+
+
+class ImportStatement(Statement):
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.node_type = NodeType('ImportStatement')
+        self.path = path # as written, relative paths are resolved by the importer
+
+    def fields(self) -> dict:
+        return {
+            'type': self.node_type.node_type,
+            'path': self.path
+        }
+
+
 class Expression(Statement):
     """Expression in AST"""
 
@@ -78,6 +124,10 @@ class FunctionCall(Expression):
         self.node_type = NodeType('FunctionCall')
         self.name = name
         self.arguments = arguments
+        # (token of the root environment, its bindings counter, weakref to the callee): filled in
+        # by the interpreter, only ever replaced as a whole so it is safe to share between threads.
+        # nothing in it keeps a finished run's environment or streams alive
+        self.cache = None
     
     def fields(self) -> dict:
         return {
@@ -103,6 +153,24 @@ class ListExpression(Expression):
         return self.node_type.node_type
 
 
+class DictExpression(Expression):
+    def __init__(self, keys: list[Expression] | None = None, values: list[Expression] | None = None) -> None:
+        super().__init__()
+        self.node_type = NodeType('DictExpression')
+        self.keys = keys or list()
+        self.values = values or list()
+
+    def fields(self) -> dict:
+        return {
+            'type': self.node_type.node_type,
+            'keys': self.keys,
+            'values': self.values
+        }
+
+    def get_type(self) -> str:
+        return self.node_type.node_type
+
+
 class AssignmentExpr(Expression):
     """Assignment expression in AST"""
 
@@ -145,6 +213,8 @@ class MemberExpr(Expression):
         self.method = method
         self.arguments = arguments
         self.is_attribute = is_attribute
+        # (receiver class, python function) inline cache, filled in by the interpreter
+        self.cache = None
     
     def fields(self) -> dict:
         return {
@@ -233,6 +303,8 @@ class ArrayIndex(Expression):
         self.index: Expression = index
         self.right = right
         self.assign = assign
+        # (array class, key types, get_index, set_index) inline cache, filled in by the interpreter
+        self.cache = None
     
     def get_type(self) -> str:
         return self.node_type.node_type
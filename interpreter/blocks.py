@@ -1,6 +1,10 @@
-from typing import Any, Self
+from __future__ import annotations
 
-from interpreter.ast import NumericLiteral
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any, Self
+
+from interpreter.ast import NumericLiteral, StringLiteral
 from . import NodeType, Statement, Expression, AssignmentExpr
 
 
@@ -38,20 +42,9 @@ class IfBlock(Block):
         super().__init__()
         self.node_type = NodeType("IfBlock")
         self.conditions: list[IfStatement] = []
-        self.pointer = 0 
     
     def add_condition(self, condition: IfStatement):
         self.conditions.append(condition)
-
-    def next_condition(self) -> IfStatement | None:
-        if self.pointer != len(self.conditions):
-            condition = self.conditions[self.pointer]
-            self.pointer += 1
-            return condition
-        return None
-    
-    def reset_conditions(self) -> None:
-        self.pointer = 0
     
     def fields(self) -> dict:
         return {'type': self.node_type.node_type, 'conditions': self.conditions}
@@ -69,10 +62,6 @@ class ForBlock(Block):
         self.limit = limit
         self.step = step or NumericLiteral(value=1)
 
-    def next(self):
-        self.initialiser += self.step
-        return self.initialiser if self.initialiser < self.limit else None
-
     def fields(self) -> dict:
         return {
             'type': self.node_type.node_type,
@@ -86,6 +75,25 @@ class ForBlock(Block):
         return self.node_type.node_type
 
 
+class ForEachBlock(Block):
+    def __init__(self, name: str, iterable: Expression) -> None:
+        super().__init__()
+        self.node_type = NodeType("ForEachBlock")
+        self.name = name
+        self.iterable = iterable
+
+    def fields(self) -> dict:
+        return {
+            'type': self.node_type.node_type,
+            'name': self.name,
+            'iterable': self.iterable,
+            'body': self.body,
+        }
+
+    def get_type(self) -> str:
+        return self.node_type.node_type
+
+
 class WhileBlock(Block):
     def __init__(self, condition: Expression) -> None:
         super().__init__()
@@ -103,16 +111,63 @@ class WhileBlock(Block):
         return self.node_type.node_type
 
 
+class CaseBlock(Block):
+    def __init__(self, label: Expression | None = None) -> None:
+        """label: None for the default case"""
+        super().__init__()
+        self.node_type = NodeType("CaseBlock")
+        self.label = label
+
+    def fields(self) -> dict:
+        return {
+            'type': self.node_type.node_type,
+            'label': self.label,
+            'body': self.body,
+        }
+
+    def get_type(self) -> str:
+        return self.node_type.node_type
+
+
 class SwitchBlock(Block):
-    pass
+    def __init__(self, subject: Expression) -> None:
+        super().__init__()
+        self.node_type = NodeType("SwitchBlock")
+        self.subject = subject
+        self.cases: list[CaseBlock] = []
+        self.default: CaseBlock | None = None
+        # label value -> case, built once parsing is done if every label is a literal
+        self.table: dict | None = None
+
+    def add_case(self, case: CaseBlock) -> None:
+        if case.label is None:
+            self.default = case
+        else:
+            self.cases.append(case)
+
+    def build_table(self) -> None:
+        """precompute the jump table, left as None when some label has to be evaluated"""
+        if not all(type(case.label) in (NumericLiteral, StringLiteral) for case in self.cases):
+            return
+        table = {}
+        for case in self.cases:
+            table.setdefault(case.label.value, case) # the first of duplicate labels wins
+        self.table = table
 
+    def fields(self) -> dict:
+        return {
+            'type': self.node_type.node_type,
+            'subject': self.subject,
+            'cases': self.cases,
+            'default': self.default,
+        }
 
-class CaseBlock(Block):
-    pass
+    def get_type(self) -> str:
+        return self.node_type.node_type
 
 
 class FuncBlock(Block):
-    def __init__(self, name: str, parameters: list[str] | None = None, body: list[Statement] | None = None, functype = 'FUNCTION', return_expr: Expression | None = None) -> None:
+    def __init__(self, name: str, parameters: list[str] | None = None, body: list[Statement] | None = None, functype = 'FUNCTION') -> None:
         """
         functypes: FUNCTION, PROCEDURE
         """
@@ -122,7 +177,9 @@ class FuncBlock(Block):
         self.name = name
         self.parameters: list[str] | None = parameters
         self.functype = functype
-        self.return_expr: Expression | None = return_expr
+
+    def is_const(self) -> bool:
+        return False
     
     def get_type(self) -> str:
         return self.node_type.node_type
@@ -133,5 +190,4 @@ class FuncBlock(Block):
             'name': self.name,
             'parameters': self.parameters,
             'body': self.body,
-            'return_expr': self.return_expr
         }
\ No newline at end of file
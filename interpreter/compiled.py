@@ -0,0 +1,106 @@
+"""
+Parse a program once and run it as often as needed, each run on its own input and output:
+
+    from interpreter import compile
+
+    program = compile(source)
+    output = program.run(stdin="3\\n4\\n")
+    output = program.run(stdin=other_input, files={"data.txt": "/srv/job-17/data.txt"})
+
+A run's environment is a fresh root on top of a frozen one holding the program's leading functions,
+which sits on the frozen builtins (see builtins_env in run.py), so nothing is copied or
+re-declared per run. Variables a run assigns live in its own root, shadowing what is below.
+"""
+import os
+from collections import Counter
+
+from . import Environment, Program, StringVal, ExtName, MK_STRING
+from . import evaluate
+from . import Streams
+from . import builtins_env, setup_env
+from .memo import collect_locals
+from .default_modules import open_file, newFile, read_table
+
+
+class CompiledProgram:
+    def __init__(self, program: Program) -> None:
+        self.program = program
+        # the functions defined before anything else runs go into the base, unless something else
+        # binds their name too: an assignment, a loop, a global or a second definition. those stay
+        # in the body, so every binding takes over exactly where the program reaches it
+        definitions = Counter(statement.name for statement in program.body if statement.get_type() == 'FuncBlock')
+        rebound = {name for name, times in definitions.items() if times > 1}
+        collect_locals(program.body, rebound)
+        collect_globals(program.body, rebound)
+
+        base = Environment(builtins_env())
+        self.body = Program()
+        for statement in program.body:
+            if not self.body.body and statement.get_type() == 'FuncBlock' and statement.name not in rebound:
+                base.declare_var(statement.name, statement)
+            else:
+                self.body.body.append(statement)
+        self.base = base.freeze()
+
+    def run(self, stdin=None, files: dict[str, str] | None = None) -> str:
+        """
+        run the program, returning everything it printed.
+        stdin: the lines input() gets, as one string, a list of lines or a file object
+        (nothing by default, input() then fails with EOFError)
+        files: name used in the program: path it stands for, for open, newFile and readTable
+        """
+        env = self.environment(stdin, files)
+        evaluate(self.body, env)
+        return env.streams.getvalue()
+
+    def environment(self, stdin=None, files: dict[str, str] | None = None) -> Environment:
+        """a fresh root for one run, see run"""
+        if stdin is None or isinstance(stdin, str):
+            streams = Streams(input_lines=[] if stdin is None else stdin.splitlines(), capture=True)
+        elif hasattr(stdin, "readline"):
+            streams = Streams(input_file=stdin, capture=True)
+        else:
+            streams = Streams(input_lines=stdin, capture=True)
+
+        env = setup_env(streams, self.base)
+        if files:
+            for name, function in redirected_files(files).items():
+                env.declare_var(name, ExtName(function))
+        return env
+
+
+def collect_globals(body: list, names: set[str]) -> None:
+    """every name assigned with global, inside functions as well"""
+    for node in body:
+        match node.get_type():
+            case 'AssignmentExpr' | 'ArrayAssignmentExpr':
+                if node.i_type == 'GLOBAL':
+                    names.add(node.left)
+            case 'FuncBlock' | 'ForBlock' | 'ForEachBlock' | 'WhileBlock':
+                collect_globals(node.body, names)
+            case 'IfBlock':
+                for condition in node.conditions:
+                    collect_globals(condition.body, names)
+            case 'SwitchBlock':
+                for case in node.cases:
+                    collect_globals(case.body, names)
+                if node.default is not None:
+                    collect_globals(node.default.body, names)
+
+
+def redirected_files(files: dict[str, str]) -> dict:
+    """open, newFile and readTable working on files[name] instead of the name a program uses"""
+    def path(filename: StringVal) -> StringVal:
+        return MK_STRING(os.fspath(files.get(filename.value, filename.value)))
+
+    return {
+        "open": lambda filename, *args: open_file(path(filename), *args),
+        "newFile": lambda filename=StringVal(""): newFile(path(filename)),
+        "readTable": lambda filename, *args: read_table(path(filename), *args),
+    }
+
+
+def compile(source: str) -> CompiledProgram:
+    """parse source once, for CompiledProgram.run to run any number of times"""
+    from . import Parser
+    return CompiledProgram(Parser().produce_ast(source))
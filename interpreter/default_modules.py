@@ -1,28 +1,57 @@
 """
 In this file we define default modules for the interpreter
 """
-import random
+import atexit
+from array import array
+import importlib
+from itertools import islice
+import os
+import weakref
+
+from . import StringVal, MappedText, NumberArray, ListVal, RuntimeVal, NumberVal, BoolVal, NullVal, RangeVal, MK_STRING, MK_NUMBER, MK_BOOL, MK_DICT, MK_NULL
+from . import NativeFunction
+# files at least this big are memory mapped by readFile instead of read into a string
+MMAP_MIN = 1 << 20
+# characters a file writer collects before writing them out, unless open() is given a size
+WRITE_BUFFER_SIZE = 1 << 16
+# chunks a background writer may have waiting before the program has to wait for the disk
+WRITE_QUEUE_SIZE = 8
+OPEN_WRITERS = weakref.WeakSet()
+# lines readTable splits and converts at a time
+TABLE_CHUNK_LINES = 1 << 14
+# compression: (file extensions, magic bytes at the start of the file, module with its open function),
+# the modules are only imported once a compressed file turns up
+COMPRESSIONS = {
+    "gzip": ((".gz",), b"\x1f\x8b", "gzip"),
+    "bz2": ((".bz2",), b"BZh", "bz2"),
+    "xz": ((".xz", ".lzma"), b"\xfd7zXZ\x00", "lzma"),
+}
 
-from . import StringVal, RuntimeVal, NumberVal, MK_STRING, MK_NUMBER, MK_BOOL
 def get_default_modules() -> dict:
     modules = {
-        "print": print,
-        "random": lambda x, y: random.randint(x.value, y.value),
-        "input": input,
-        "open": lambda x: FileHandler(x),
+        "random": NativeFunction("random", random_int, ("int", "int"), returns="number"),
+        "open": open_file,
         "newFile": newFile,
+        "readTable": read_table,
         "str": lambda x: cast_type("string", x),
         "int": lambda x: cast_type("int", x),
         "float": lambda x: cast_type("float", x),
         "real": lambda x: cast_type("float", x),
         "bool": lambda x: cast_type("bool", x),
-        "ASC": StringVal.ASC,
-        "CHR": StringVal.CHR
+        "dict": lambda: MK_DICT(),
+        "range": lambda *args: RangeVal(range(*(arg.value for arg in args))),
+        "ASC": NativeFunction("ASC", ord, ("string",), returns="number", pure=True),
+        "CHR": NativeFunction("CHR", chr, ("int",), returns="string", pure=True)
     }
 
     return modules
 
 
+def random_int(low: int, high: int) -> int:
+    import random # loaded by the programs that use it, not by every one
+    return random.randint(low, high)
+
+
 def cast_type(datatype: str, value: RuntimeVal) -> RuntimeVal:
     match datatype:
         case "int":
@@ -46,55 +75,313 @@ def cast_type(datatype: str, value: RuntimeVal) -> RuntimeVal:
 
 
 def newFile(filename: StringVal = StringVal("")):
-    with open(filename, "w") as f:
-        pass
-    file_handler = FileHandler(filename)
-    return file_handler
+    return FileHandler(filename.value, "w")
+
+
+def open_file(filename: StringVal, mode: StringVal | None = None, buffer_size: NumberVal | None = None,
+              background: BoolVal | None = None):
+    """open(filename, mode, bufferSize, background), mode is r (the default), w or a"""
+    return FileHandler(
+        filename.value,
+        "r" if mode is None else mode.value,
+        WRITE_BUFFER_SIZE if buffer_size is None else buffer_size.value,
+        background is not None and background.value,
+    )
+
+
+def compression_of(filename: str, mode: str = "r") -> str | None:
+    """compression a file uses, by extension, or when reading also by its first bytes"""
+    for name, (extensions, magic, _) in COMPRESSIONS.items():
+        if filename.endswith(extensions):
+            return name
+    if mode != "r":
+        return None
+    with open(filename, "rb") as f:
+        start = f.read(6)
+    for name, (_, magic, _) in COMPRESSIONS.items():
+        if start.startswith(magic):
+            return name
+    return None
+
+
+def open_text(filename: str, mode: str = "r", compression: str | None = None):
+    """text file object, compressed and decompressed on the fly as it is written or read"""
+    if compression is None:
+        return open(filename, mode)
+    return importlib.import_module(COMPRESSIONS[compression][2]).open(filename, mode + "t")
+
+
+def read_table(filename: StringVal, sep: StringVal | None = None) -> ListVal:
+    """
+    readTable(filename, sep): one list of numbers per column of a delimited file, sep defaults
+    to any run of whitespace. lines are split and converted a chunk at a time straight into
+    arrays, so no string or number value is made for the fields
+    """
+    delimiter = None if sep is None else sep.value
+    columns: list[array] = []
+    with open_text(filename.value, "r", compression_of(filename.value)) as f:
+        while rows := [line.split(delimiter) for line in islice(f, TABLE_CHUNK_LINES) if line.strip()]:
+            if not columns:
+                columns = [array('q') for _ in rows[0]]
+            for row in rows:
+                if len(row) != len(columns):
+                    raise ValueError(f"readTable: expected {len(columns)} columns, got {len(row)} in {row}")
+            columns = [extend_column(column, fields) for column, fields in zip(columns, zip(*rows))]
+
+    return ListVal(list(map(NumberArray, columns)), boxed=True)
+
+
+def extend_column(column: array | list, fields: tuple[str, ...]) -> array | list:
+    """
+    whole numbers until a field is not one, then the column turns into floats. a whole number
+    too big for 64 bits turns it into a list of python numbers instead, to keep every digit
+    """
+    if type(column) is list:
+        column.extend(map(parse_number, fields))
+        return column
+    if column.typecode == 'q':
+        length = len(column)
+        try:
+            column.extend(map(int, fields))
+            return column
+        except ValueError:
+            del column[length:]
+            column = array('d', column)
+        except OverflowError:
+            del column[length:]
+            column = column.tolist()
+            column.extend(map(parse_number, fields))
+            return column
+    column.extend(map(float, fields))
+    return column
+
+
+def parse_number(field: str) -> int | float:
+    try:
+        return int(field)
+    except ValueError:
+        return float(field)
+
+
+class FileWriter:
+    """
+    text for a file collected into chunks of about buffer_size characters, each chunk is written
+    as soon as it fills up, by a background thread if asked so the program does not wait on the disk
+    """
+
+    def __init__(self, filename: str, mode: str, buffer_size: int = WRITE_BUFFER_SIZE, background: bool = False) -> None:
+        self.file = open_text(filename, mode, compression_of(filename, mode))
+        self.buffer: list[str] = []
+        self.buffered = 0
+        self.buffer_size = buffer_size
+        self.error: Exception | None = None # from the background thread, raised by the next flush or close
+        self.queue = None # queue.Queue and threading.Thread of a background writer
+        self.thread = None
+        if background:
+            import queue
+            import threading
+            # bounded, a program writing faster than the disk waits instead of piling up chunks
+            self.queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+            self.thread = threading.Thread(target=self.drain, daemon=True)
+            self.thread.start()
+        OPEN_WRITERS.add(self)
+        # a writer dropped without close() still writes out its buffer. at exit close_writers
+        # does it instead, in order with a background thread's queue
+        self.finish = weakref.finalize(self, finish_writing, self.file, self.buffer)
+        self.finish.atexit = False
+
+    def write(self, text: str) -> None:
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        chunk = "".join(self.buffer)
+        self.buffer.clear() # the same list stays with finish_writing
+        self.buffered = 0
+        if self.queue is None:
+            self.file.write(chunk)
+        else:
+            self.raise_error()
+            self.queue.put(chunk)
+
+    def drain(self) -> None:
+        """background thread: writes chunks in order until close() sends None"""
+        while (chunk := self.queue.get()) is not None:
+            if self.error is None:
+                try:
+                    self.file.write(chunk)
+                except Exception as error: # the thread has to keep taking chunks or put() blocks forever
+                    self.error = error
+
+    def raise_error(self) -> None:
+        if self.error is not None:
+            raise self.error
+
+    def close(self) -> None:
+        if self.file.closed:
+            return
+        self.flush()
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+        self.file.close()
+        self.finish.detach()
+        OPEN_WRITERS.discard(self)
+        self.raise_error()
+
+
+def finish_writing(file, buffer: list[str]) -> None:
+    """what close does, for a writer collected without being closed"""
+    if not file.closed:
+        file.write("".join(buffer))
+        file.close()
+
+
+@atexit.register
+def close_writers() -> None:
+    """write out what is still buffered for files the program never closed"""
+    for writer in list(OPEN_WRITERS):
+        writer.close()
+
+
+def stripped_lines(file):
+    """
+    the lines of file as f.read().strip().splitlines() gives them, read one at a time:
+    blank lines are only held back until a line with text shows they are not trailing
+    """
+    previous = None
+    blanks = []
+    line = file.readline()
+    while line:
+        line = line.rstrip("\n")
+        if line.strip() == "":
+            if previous is not None:
+                blanks.append(line)
+        elif previous is None:
+            previous = line.lstrip()
+        else:
+            yield previous
+            yield from blanks
+            blanks.clear()
+            previous = line
+        line = file.readline()
+
+    if previous is not None:
+        yield previous.rstrip()
+
 
 class FileHandler(RuntimeVal):
-    def __init__(self, filename: StringVal) -> None:
+    method_set: dict = {
+        "readLine": "readLine",
+        "writeLine": "writeLine",
+        "close": "close",
+        "readFile": "readFile",
+        "writeFile": "writeFile",
+        "endOfFile": "endOfFile"
+    }
 
-        self.filename = filename.value
-        
-        self.lines: list = []
-        self.__get_lines()
-        self.reading_lines = self.lines.copy()
-        self.line_write = []
-        self.method_set: dict = {
-            "readLine": self.readLine,
-            "writeLine": self.writeLine,
-            "close": self.close,
-            "readFile": self.readFile,
-            "writeFile": self.writeFile
-        }
+    def __init__(self, filename: str, mode: str = "r", buffer_size: int = WRITE_BUFFER_SIZE, background: bool = False) -> None:
+        super().__init__('OBJECT')
+        if mode not in ("r", "w", "a"):
+            raise ValueError(f'Invalid file mode "{mode}", expected "r", "w" or "a"')
+        self.filename = filename
+        self.mode = mode
+        self.text: StringVal | None = None # readFile, kept once loaded
         self.value = "File Handler for " + self.filename
-    
-    
-    def __get_lines(self):
-        file = self.filename
-        with open(file, "r") as f:
-            self.lines = f.read().strip().splitlines()
+
+        if mode == "r":
+            self.compression = compression_of(filename)
+            # lines are pulled from the file as they are read, one line ahead for endOfFile
+            self.file = open_text(self.filename, "r", self.compression)
+            # closes the file when the handle is collected or the program ends, if nothing did before
+            self.close_file = weakref.finalize(self, self.file.close)
+            self.lines = stripped_lines(self.file)
+            self.next_line: str | None = self.read_ahead()
+            self.line_write = [] # written over the file on close, as files opened for reading always did
+            self.writer = None
+        else:
+            self.file = None
+            self.next_line = None
+            self.writer = FileWriter(self.filename, mode, buffer_size, background)
+
+    def __iter__(self):
+        """the lines not read yet"""
+        while self.next_line is not None:
+            yield self.readLine()
+
+    def check_readable(self) -> None:
+        if self.writer is not None:
+            raise IOError(f"File {self.filename} is not open for reading")
+
+    def endOfFile(self) -> BoolVal:
+        return MK_BOOL(self.next_line is None)
+
     def readLine(self) -> StringVal:
-        if len(self.reading_lines) == 0:
+        self.check_readable()
+        line = self.next_line
+        if line is None:
             raise EOFError(f"End of file {self.filename}")
-        return MK_STRING(self.reading_lines.pop(0))
+        self.next_line = self.read_ahead()
+        return MK_STRING(line)
 
+    def read_ahead(self) -> str | None:
+        """the line after the current one, the file is closed once there are none left"""
+        line = next(self.lines, None)
+        if line is None:
+            self.close_file()
+        return line
+
+    def writeLine(self, line) -> NullVal:
+        if self.writer is None:
+            self.line_write.append(str(line.value))
+        else:
+            self.writer.write(f"{line.value}\n")
+        return MK_NULL()
     
-    def writeLine(self, line) -> None:
-        self.line_write.append(line)
-    
-    def writeFile(self, text) -> None:
-        with open(self.filename, "w") as f:
-            f.write(text)
+    def writeFile(self, text) -> NullVal:
+        if self.writer is None:
+            with open_text(self.filename, "w", self.compression) as f:
+                f.write(text.value)
+        else:
+            self.writer.write(text.value)
+        return MK_NULL()
 
     def readFile(self) -> StringVal:
-        with open(self.filename, "r") as f:
-            return MK_STRING(f.read())
+        """
+        whole file, read once however often it is asked for, without moving readLine.
+        big files are memory mapped and only decoded as far as they are used
+        """
+        self.check_readable()
+        if self.text is None:
+            if self.compression is None and os.path.getsize(self.filename) >= MMAP_MIN:
+                import mmap
+                with open(self.filename, "rb") as f: # the mapping outlives the file object
+                    self.text = MappedText(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            elif self.file.closed or self.compression is not None: # no seeking back in a stream
+                with open_text(self.filename, "r", self.compression) as f:
+                    self.text = MK_STRING(f.read())
+            else:
+                position = self.file.tell()
+                self.file.seek(0)
+                self.text = MK_STRING(self.file.read())
+                self.file.seek(position)
+        return self.text
     
-    def close(self) -> None:
-        self.writeFile(text="\n".join(self.line_write))
+    def close(self) -> NullVal:
+        if self.writer is not None:
+            self.writer.close()
+            return MK_NULL()
+        self.close_file()
+        if self.line_write:
+            with open_text(self.filename, "w", self.compression) as f:
+                f.write("\n".join(self.line_write))
+            self.line_write = []
+        return MK_NULL()
     
     # always put get_name method
     def get_name(self) -> str:
         return self.__class__.__name__
-    
\ No newline at end of file
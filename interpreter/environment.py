@@ -1,34 +1,118 @@
-from . import RuntimeVal
+from itertools import count
+from types import MappingProxyType
+
+from . import RuntimeVal, ExtName, FuncBlock
+
+# released function frames, reused by Environment.acquire instead of allocating new ones
+FRAME_POOL: list["Environment"] = []
+FRAME_POOL_SIZE = 256
+# tells roots apart in call site caches without holding on to them
+ROOT_TOKENS = count()
+# constants of an environment that has none, replaced by a set of its own on the first const
+NO_CONSTANTS: frozenset[str] = frozenset()
 
 
 class Environment:
     def __init__(self, parent=None) -> None:
         self.parent = parent
         self.variables: dict[str, RuntimeVal] = {}  # identifier: value
+        # names bound with const here: it is the name that cannot change, not the value,
+        # which other names (or every program, for the builtins) may share
+        self.constants: set[str] | frozenset[str] = NO_CONSTANTS
+        # a frozen environment (see freeze) is shared, whatever is built on it is a root of its own
+        self.frozen = False
+        self.root: Environment = self if parent is None or parent.frozen else parent.root
+        # only kept up to date on the root: names that ever held a callable, and a
+        # counter bumped whenever one of them may resolve differently (see call site caches)
+        self.callable_names: set[str] = set()
+        if parent is not None and parent.frozen: # shadowing a builtin has to invalidate caches as well
+            self.callable_names = set(parent.callable_names)
+        self.bindings = 0
+        self.token = next(ROOT_TOKENS)
+        # 'BREAK', 'CONTINUE' or 'RETURN' while one is unwinding the blocks of this frame
+        self.signal: str | None = None
+        self.return_value: RuntimeVal | None = None
+        # only set on the root: Memoizer caching the results of pure functions, see run.py
+        self.memo = None
+        # only set on the root: Streams that print and input read and write
+        self.streams = None
+
+    @classmethod
+    def acquire(cls, parent, variables: dict[str, RuntimeVal]):
+        """function frame with its parameters already bound, taken from the pool if possible"""
+        try: # one pop, another thread may empty the pool between checking and popping
+            frame = FRAME_POOL.pop()
+        except IndexError:
+            frame = cls(parent)
+            frame.variables = variables
+        else:
+            frame.parent = parent
+            frame.root = parent.root
+            frame.variables = variables
+
+        root = frame.root
+        if not root.callable_names.isdisjoint(variables): # a parameter shadows a function
+            root.bindings += 1
+        return frame
+
+    def release(self) -> None:
+        """give a frame from acquire back to the pool once its function has returned"""
+        self.parent = None
+        self.root = self
+        self.variables = {}
+        self.constants = NO_CONSTANTS
+        self.signal = None
+        self.return_value = None
+        if len(FRAME_POOL) < FRAME_POOL_SIZE:
+            FRAME_POOL.append(self)
+
+    def freeze(self):
+        """
+        make this environment read-only so any number of programs can run on top of it,
+        each with its own root, instead of copying it (see builtins_env in run.py)
+        """
+        self.variables = MappingProxyType(self.variables)
+        self.frozen = True
+        return self
+
+    def track_binding(self, varname: str, value: RuntimeVal) -> None:
+        """invalidate call site caches when a name that is or was callable gets rebound"""
+        root = self.root
+        if varname in root.callable_names:
+            root.bindings += 1
+        elif isinstance(value, (FuncBlock, ExtName)):
+            root.callable_names.add(varname)
+            root.bindings += 1
 
     def declare_var(self, varname: str, value: RuntimeVal) -> RuntimeVal:
         if varname in self.variables:
             raise ValueError(f'Variable {varname} already declared')
 
+        self.track_binding(varname, value)
         self.variables[varname] = value
         return value
 
     def assign_var(self, varname: str, value: RuntimeVal) -> RuntimeVal:
-        if self.variables.get(varname):
-            if self.variables[varname].is_const():
-                raise ValueError(f'Cannot modify value, Variable {varname} is constant')
+        if varname in self.constants:
+            raise ValueError(f'Cannot modify value, Variable {varname} is constant')
+        self.track_binding(varname, value)
         self.variables[varname] = value
 
         return value
-    
+
+    def assign_const(self, varname: str, value: RuntimeVal) -> RuntimeVal:
+        self.assign_var(varname, value)
+        if self.constants is NO_CONSTANTS:
+            self.constants = set()
+        self.constants.add(varname)
+        return value
+
     def assign_global_var(self, varname: str, value: RuntimeVal) -> RuntimeVal:
         env = self.get_global_scope()
         env.assign_var(varname, value)
-    
+
     def get_global_scope(self):
-        if self.parent is None:
-            return self
-        return self.parent.get_global_scope()
+        return self.root
 
     def get_var(self, varname: str) -> RuntimeVal:
         env = self.resolve(varname)
@@ -1,28 +1,48 @@
+from __future__ import annotations
 # value types
-from re import L
-from typing import Any
+import operator
+import weakref
 
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import Any
 
 
-from . import Block, IfBlock, IfStatement
-from . import ValueType, RuntimeVal, NumberVal, NullVal, BoolVal, ListVal
+
+from . import Block, IfBlock, IfStatement, FuncBlock
+from . import ValueType, RuntimeVal, NumberVal, NullVal, BoolVal, ListVal, StringVal, ExtName, NativeFunction
 # Expression types
-from . import BinaryExpr, Identifier, AssignmentExpr, UnaryExpr, ArrayIndex, MemberExpr, ListExpression
+from . import Expression, BinaryExpr, Identifier, AssignmentExpr, UnaryExpr, ArrayIndex, MemberExpr, ListExpression, DictExpression
 # statement types
 from . import NodeType, Statement, Program
 from . import Environment
 # value constructors
-from . import MK_VALUE, MK_NULL, MK_BOOL, MK_NUMBER, MK_STRING, MK_LIST, is_iterable, is_mutable_iterable
+from . import MK_VALUE, MK_NULL, MK_BOOL, MK_NUMBER, MK_STRING, MK_LIST, MK_DICT, is_iterable, is_mutable_iterable
 
 
 
 # TODO: create some sort of expected type to prevent passing in wrong types, e.g. functions names into expression evalutions
 
+COMPARISONS = {
+    '<': operator.lt,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+# the AST is read-only here: anything that changes while a program runs lives in
+# the Environment (frame) or in python locals, so one parsed Program can be
+# evaluated by several threads or recursive activations at once
+
 
 def evaluate_program(program: Program | Block, env: Environment) -> RuntimeVal:
     last_evaluated: RuntimeVal = MK_NULL()
     for statement in program.body:
         last_evaluated = evaluate(statement, env)
+        if env.signal is not None: # break, continue or return: unwind to the loop/function
+            break
     return last_evaluated
 
 
@@ -34,12 +54,21 @@ def evaluate(astNode: Statement, env: Environment) -> RuntimeVal:
             return evaluate_if_block(astNode, env)
         case 'ForBlock':
             return evaluate_for_block(astNode, env)
+
+        case 'ForEachBlock':
+            return evaluate_for_each_block(astNode, env)
         
         case 'WhileBlock':
             return evaluate_while_block(astNode, env)
+
+        case 'SwitchBlock':
+            return evaluate_switch_block(astNode, env)
         
         case 'ListExpression':
             return evaluate_list_expression(astNode, env)
+
+        case 'DictExpression':
+            return evaluate_dict_expression(astNode, env)
         
         case 'FunctionCall':
             return evaluate_function_call(astNode, env)
@@ -73,6 +102,20 @@ def evaluate(astNode: Statement, env: Environment) -> RuntimeVal:
         case "MemberExpr":
             return evaluate_member_expr(astNode, env)
 
+        case "ReturnStatement":
+            return evaluate_return_statement(astNode, env)
+
+        case "ImportStatement":
+            return evaluate_import_statement(astNode, env)
+
+        case "BreakStatement":
+            env.signal = 'BREAK'
+            return MK_NULL()
+
+        case "ContinueStatement":
+            env.signal = 'CONTINUE'
+            return MK_NULL()
+
         case _:
             raise TypeError('Invalid AST node type ' + astNode.get_type())
 
@@ -81,49 +124,139 @@ def evaluate_func_block(func_block, env: Environment) -> Any:
     env.assign_var(func_block.name, func_block)
     return MK_NULL()
 
-def evaluate_if_block(if_block, env: Environment) -> Any:
-    if_block.reset_conditions()
+def evaluate_import_statement(import_statement, env: Environment) -> Any:
+    from .modules import import_module # modules needs the parser, which is loaded after this module
+    import_module(import_statement.path, env)
+    return MK_NULL()
 
-    while True:
-        curr_condition = if_block.next_condition()
-        if curr_condition is None:
-            return MK_NULL()
+def evaluate_if_block(if_block, env: Environment) -> Any:
+    for curr_condition in if_block.conditions:
         if curr_condition.condition is None:
-            if_block.reset_conditions()
             return evaluate_program(curr_condition, env)
-        if evaluate(curr_condition.condition, env):
+        if evaluate_condition(curr_condition.condition, env):
             return evaluate_program(curr_condition, env)
+    return MK_NULL()
 
 def evaluate_for_block(for_block, env: Environment) -> Any:
-    evaluate(for_block.initialising_expr, env)
-    if isinstance(for_block.step, BinaryExpr):
-        for_block.step = evaluate(for_block.step, env)
+    start = evaluate(for_block.initialising_expr, env).value
+    step = evaluate(for_block.step, env).value or 1
     limit = evaluate(for_block.limit, env)
+    if type(start) is int and type(step) is int and type(limit.value) is int:
+        return evaluate_counted_for_block(for_block, env, start, limit.value, step)
+
     while env.get_var(for_block.initialiser).value != limit.value: 
         evaluate_program(for_block, env)
-        env.assign_var(for_block.initialiser, MK_NUMBER(env.get_var(for_block.initialiser).value + (for_block.step.value or 1)))
+        if env.signal is not None and end_iteration(env):
+            break
+        env.assign_var(for_block.initialiser, MK_NUMBER(env.get_var(for_block.initialiser).value + step))
     
     return MK_NULL()
 
 
+def evaluate_counted_for_block(for_block, env: Environment, start: int, limit: int, step: int) -> Any:
+    """
+    fast path for integer loops: drives a native range and writes the loop
+    variable straight into its slot in the current frame
+    (the initialising assignment has already done the const check)
+    """
+    name = for_block.initialiser
+    variables = env.variables
+    body = for_block.body
+    iterations = range(start, limit, step)
+    for i in iterations:
+        variables[name] = NumberVal(i)
+        for statement in body:
+            evaluate(statement, env)
+            if env.signal is not None:
+                break
+        if env.signal is not None and end_iteration(env):
+            break
+    else:
+        # leave the variable one step past the last iteration, like the general loop
+        variables[name] = NumberVal(start + len(iterations) * step)
+    return MK_NULL()
+
+
+def evaluate_for_each_block(for_each_block, env: Environment) -> Any:
+    """for x in collection: drives the python iterator of the value directly"""
+    collection = evaluate(for_each_block.iterable, env)
+    try:
+        iterator = iter(collection)
+    except TypeError:
+        raise TypeError(f"{collection} is not iterable") from None
+
+    name = for_each_block.name
+    variables = env.variables
+    if name in env.constants:
+        raise ValueError(f'Cannot modify value, Variable {name} is constant')
+    env.track_binding(name, None)
+
+    body = for_each_block.body
+    for item in iterator:
+        variables[name] = item
+        for statement in body:
+            evaluate(statement, env)
+            if env.signal is not None:
+                break
+        if env.signal is not None and end_iteration(env):
+            break
+    return MK_NULL()
+
+
+def end_iteration(env: Environment) -> bool:
+    """consume a break/continue that ended the loop body early, True when the loop has to stop"""
+    match env.signal:
+        case 'CONTINUE':
+            env.signal = None
+            return False
+        case 'BREAK':
+            env.signal = None
+            return True
+    return True # return: leave the signal for the function
+
+
 def evaluate_while_block(while_block, env: Environment) -> Any:
-    while evaluate(while_block.condition, env):
+    while evaluate_condition(while_block.condition, env):
         evaluate_program(while_block, env)
+        if env.signal is not None and end_iteration(env):
+            break
 
     return MK_NULL()
     
 
 
+def evaluate_switch_block(switch_block, env: Environment) -> Any:
+    subject = evaluate(switch_block.subject, env).value
+    table = switch_block.table
+    if table is not None: # every label is a literal: one lookup
+        try:
+            case = table.get(subject, switch_block.default)
+        except TypeError: # unhashable subject, cannot equal any literal
+            case = switch_block.default
+    else:
+        case = switch_block.default
+        for candidate in switch_block.cases:
+            if evaluate(candidate.label, env).value == subject:
+                case = candidate
+                break
+
+    if case is None:
+        return MK_NULL()
+    return evaluate_program(case, env)
+
+
 def evaluate_assignment_expr(expr: AssignmentExpr, env: Environment) -> RuntimeVal:
+    return assign_value(expr, evaluate(expr.right, env), env)
+
+
+def assign_value(expr: AssignmentExpr, evaluation: RuntimeVal | list[Any], env: Environment) -> RuntimeVal:
     left_side = expr.left
-    evaluation: RuntimeVal | list[Any] = evaluate(expr.right, env)
     if isinstance(evaluation, RuntimeVal):
         right_side = evaluation
     else:
         right_side = MK_LIST(evaluation)
     if expr.i_type == "CONST":
-        right_side.set_const()
-        env.assign_var(left_side, right_side)
+        env.assign_const(left_side, right_side)
     elif expr.i_type == "GLOBAL":
         env.assign_global_var(left_side, right_side)
     else:
@@ -132,122 +265,226 @@ def evaluate_assignment_expr(expr: AssignmentExpr, env: Environment) -> RuntimeV
     return right_side
 
 
+def resolve_member(expr: MemberExpr, object_: RuntimeVal):
+    """find the python function behind .method on object_'s class and cache it on the node"""
+    method = expr.method
+    table_name = "attribute_set" if expr.is_attribute else "method_set"
+    table = getattr(object_, table_name, None)
+    if table is None:
+        raise TypeError(f"{'Attribute' if expr.is_attribute else 'Method'} set not available for {expr.name}")
+    
+    if method not in table:
+        raise NameError(f"{'Attribute' if expr.is_attribute else 'Method'} {method} not found in object {expr.name}")
+
+    cls = type(object_)
+    function = getattr(cls, table[method])
+    expr.cache = (cls, function)
+    return function
+
+
+def member_function(expr: MemberExpr, object_: RuntimeVal):
+    cache = expr.cache
+    if cache is not None and cache[0] is type(object_):
+        return cache[1]
+    return resolve_member(expr, object_)
+
+
 def evaluate_member_expr(expr: MemberExpr, env: Environment) -> RuntimeVal:
     object_ = evaluate(expr.name, env)
-    method = expr.method
+    function = member_function(expr, object_)
+
     if expr.is_attribute:
-        if not hasattr(object_, "attribute_set"):
-            raise TypeError(f"Attribute set not available for {expr.name}")
-        
-        if method not in object_.attribute_set:
-            raise NameError(f"Attribute {method} not found in object {expr.name}")
-        
-        return object_.attribute_set[method]()
+        return function(object_)
 
-    arguments = evaluate_list_expression(expr.arguments, env)
-    if "method_set" in dir(object_):
-        method_set = object_.method_set
-    else:
-        raise TypeError(f"Method set not available for {expr.name}")
-    
-    if method not in method_set:
-        raise NameError(f"Method {method} not found in object {expr.name}")
-    
-    return method_set[method](*arguments.value)
+    return function(object_, *[evaluate(arg, env) for arg in expr.arguments.elements])
 
-def evaluate_array_index(expr: ArrayIndex, env: Environment) -> RuntimeVal:
-    array = env.get_var(expr.array)
+
+def resolve_index(expr: ArrayIndex, array: RuntimeVal) -> tuple:
+    """(class, key types, get_index, set_index) for indexing into array, cached on the node"""
     if not is_iterable(array):
         raise TypeError(f"Name {expr.array} is not an iterable") 
 
+    cls = type(array)
+    set_index = cls.set_index if is_mutable_iterable(array) else None
+    cache = (cls, getattr(cls, "key_types", (NumberVal,)), cls.get_index, set_index)
+    expr.cache = cache
+    return cache
+
+
+def evaluate_array_index(expr: ArrayIndex, env: Environment) -> RuntimeVal:
+    array = env.get_var(expr.array)
+    cache = expr.cache
+    if cache is None or cache[0] is not type(array):
+        cache = resolve_index(expr, array)
+    _, key_types, get_index, set_index = cache
+
     index = evaluate(expr.index, env)
-    if not isinstance(index, NumberVal):
+    if not isinstance(index, key_types):
         raise RuntimeError(f"Index {expr.index} is not valid, index={index}")
 
     if not expr.assign:
-        res = array.get_index(index.value)
-        return res
+        return get_index(array, index.value)
     
-    if not is_mutable_iterable(array):
+    if set_index is None:
         raise TypeError(f"Name {expr.array} is not a mutable iterable")
 
-    right = evaluate(expr.right, env)
+    return store_index(array, set_index, index, evaluate(expr.right, env))
+
+
+def store_index(array: RuntimeVal, set_index, index: RuntimeVal, right: RuntimeVal | list[Any]) -> RuntimeVal:
     if isinstance(right, list):
         right = MK_LIST(right)
 
-    array.set_index(index, right)
+    set_index(array, index.value, right)
     return array
 
-def evaluate_function_call(function_call, env: Environment) -> RuntimeVal | None:
+def resolve_callable(function_call, env: Environment):
+    """look the callee up through the environment chain and cache it at the call site"""
     func_name = function_call.name
-    func_block = env.get_var(func_name)
-
-    if func_block.get_type() not in ("FuncBlock", "EXT_NAME"):
+    scope = env.resolve(func_name)
+    func_block = scope.variables[func_name]
+    if not isinstance(func_block, (FuncBlock, ExtName)):
         raise RuntimeError(f"name {func_name} is not a callable")
-    
-    arguments: ListVal = evaluate_list_expression(function_call.arguments, env)
-
-    if func_block.get_type() == "EXT_NAME":
-        evaluation = func_block.value(*(arguments.value))
-        if type(evaluation) == int:
-            return MK_NUMBER(evaluation)
-        elif type(evaluation) == bool:
-            return MK_BOOL(evaluation)
-        elif type(evaluation) == str:
-            return MK_STRING(evaluation)
-        elif evaluation is None:
-            return MK_NULL() 
-        else:
-            return evaluation
+
+    root = env.root
+    if scope is root or scope.frozen: # anything found in a function frame can change from call to call
+        function_call.cache = (root.token, root.bindings, weakref.ref(func_block))
+    return func_block
+
+
+def find_callable(function_call, env: Environment):
+    root = env.root
+    cache = function_call.cache
+    if cache is not None and cache[0] == root.token and cache[1] == root.bindings:
+        return cache[2]() # still bound to the name, so still alive
+    return resolve_callable(function_call, env)
+
+
+def evaluate_function_call(function_call, env: Environment) -> RuntimeVal | None:
+    func_block = find_callable(function_call, env)
+    arguments = [evaluate(arg, env) for arg in function_call.arguments.elements]
+
+    if isinstance(func_block, ExtName):
+        return call_external(func_block, arguments)
         
     evaluation = evaluate_function(func_block, arguments, env)
     return evaluation
 
 
-def evaluate_function(func_block, arguments, env:Environment):
+def call_external(func_block: ExtName, arguments: list[RuntimeVal]) -> RuntimeVal:
+    """call a python builtin, boxing what it gives back"""
+    if type(func_block) is NativeFunction:
+        return func_block.call(arguments)
+    evaluation = func_block.value(*arguments)
+    if type(evaluation) == int:
+        return MK_NUMBER(evaluation)
+    elif type(evaluation) == bool:
+        return MK_BOOL(evaluation)
+    elif type(evaluation) == str:
+        return MK_STRING(evaluation)
+    elif evaluation is None:
+        return MK_NULL() 
+    else:
+        return evaluation
+
+
+def evaluate_function(func_block, arguments: list[RuntimeVal], env:Environment):
     parameters = func_block.parameters
-    if len(parameters) != arguments.length:
+    if len(parameters) != len(arguments):
         raise RuntimeError(f"Incorrect amount of arguments, expected {len(parameters)}, got {len(arguments)}")
-    
-    new_env = Environment(parent=env)
-    for param, arg in zip(parameters, arguments.value):
-        new_env.assign_var(varname=param, value=arg)
-    evaluate_program(func_block, new_env)
-    return evaluate(func_block.return_expr, new_env)
-#TODO
+
+    memo = env.root.memo
+    if memo is not None:
+        table = memo.table_for(func_block, env)
+        key = None if table is None else table.key(arguments)
+        if key is not None:
+            result = table.get(key)
+            if result is None:
+                result = call_function(func_block, arguments, env)
+                table.put(key, result)
+            return result
+
+    return call_function(func_block, arguments, env)
+
+
+def call_function(func_block, arguments: list[RuntimeVal], env: Environment) -> RuntimeVal:
+    frame = Environment.acquire(env, dict(zip(func_block.parameters, arguments)))
+    try:
+        evaluate_program(func_block, frame)
+        if frame.signal == 'RETURN':
+            return frame.return_value
+        return MK_NULL()
+    finally:
+        frame.release()
+
+
+def evaluate_return_statement(return_statement, env: Environment) -> RuntimeVal:
+    value = MK_NULL() if return_statement.value is None else evaluate(return_statement.value, env)
+    env.return_value = value
+    env.signal = 'RETURN'
+    return value
 
 def evaluate_list_expression(list_expr: ListExpression, env: Environment) -> ListVal:
     return MK_LIST([evaluate(arg, env) for arg in list_expr.elements])
 
 
+def evaluate_dict_expression(dict_expr: DictExpression, env: Environment) -> RuntimeVal:
+    dict_ = MK_DICT()
+    for key, value in zip(dict_expr.keys, dict_expr.values):
+        dict_.set_index(dict_.hash_key(evaluate(key, env)), evaluate(value, env))
+    return dict_
+
+
 def evaluate_binary_expression(binop: BinaryExpr, env: Environment) -> RuntimeVal:
+    if binop.binop_type == 'BOOLEAN':
+        return MK_BOOL(eval_boolean_binop(binop, env))
+
     left_side: RuntimeVal = evaluate(binop.left, env)
     right_side: RuntimeVal = evaluate(binop.right, env)
 
     if binop.binop_type == 'NUMERIC':
         return eval_numeric_binop(left_side, right_side, binop.operator)
-    elif binop.binop_type == 'BOOLEAN':
-        return eval_boolean_binop(left_side, right_side, binop.operator)
 
     return MK_NULL()
 
 
-def eval_boolean_binop(left: BoolVal, right: BoolVal, operator: str) -> RuntimeVal:
-    match operator:
+def eval_boolean_binop(binop: BinaryExpr, env: Environment) -> bool:
+    """AND/OR, short-circuiting: the right side is only evaluated when it decides the result"""
+    match binop.operator:
         case 'AND':
-            return MK_BOOL(left.value and right.value)
+            return evaluate_condition(binop.left, env) and evaluate_condition(binop.right, env)
 
         case 'OR':
-            return MK_BOOL(left.value or right.value)
+            return evaluate_condition(binop.left, env) or evaluate_condition(binop.right, env)
 
         case _:
-            raise RuntimeError(f"unable to parse operator {operator}")
+            raise RuntimeError(f"unable to parse operator {binop.operator}")
+
+
+def evaluate_condition(expr: Expression, env: Environment) -> bool:
+    """
+    truth value of expr as a python bool, for if/while and logic operators:
+    comparisons, AND/OR and NOT are decided here without boxing a BoolVal
+    """
+    node_type = type(expr)
+    if node_type is BinaryExpr:
+        compare = COMPARISONS.get(expr.operator)
+        if compare is not None:
+            return compare(evaluate(expr.left, env).value, evaluate(expr.right, env).value)
+        if expr.binop_type == 'BOOLEAN':
+            return eval_boolean_binop(expr, env)
+    elif node_type is UnaryExpr and expr.operator == 'NOT':
+        return not evaluate_condition(expr.right, env)
+
+    return bool(evaluate(expr, env).value)
 
 
 def eval_numeric_binop(left: NumberVal, right: NumberVal, operator: str) -> RuntimeVal:
     result = 0 
     match operator:
         case '+':
+            if isinstance(left, StringVal):
+                return left + right
             result = left.value + right.value
         case '-':
             result = left.value - right.value
@@ -286,11 +523,9 @@ def eval_comparison_expression(left, right, operator) -> BoolVal:
 
 
 def evaluate_unary_expression(unop: UnaryExpr, env: Environment) -> RuntimeVal:
-    right = evaluate(unop.right, env)
     match unop.operator:
         case 'NOT':
-            print(type(right))
-            return MK_BOOL(not bool(right))
+            return MK_BOOL(not evaluate_condition(unop.right, env))
 
 
 def evaluate_identifier(identifier: Identifier, env: Environment) -> RuntimeVal:
@@ -1,5 +1,22 @@
 import re as regex
 
+ESCAPES = {
+    'n': '\n',
+    't': '\t',
+    'r': '\r',
+    '0': '\0',
+    '\\': '\\',
+    '"': '"',
+    "'": "'",
+}
+
+
+def unescape(text: str) -> str:
+    """replace escape sequences in a string literal with the characters they stand for"""
+    if '\\' not in text:
+        return text
+    return regex.sub(r'\\(.)', lambda m: ESCAPES.get(m.group(1), m.group()), text)
+
 
 class Lexer:
     def __init__(self, lines: str) -> None:
@@ -8,20 +25,23 @@ class Lexer:
         self.pos = 0
 
         self.rules = {
-            'IGNORE': r'\s+',
+            'IGNORE': r'[^\S\n]+',
             'NAME': '[a-zA-Z_][a-zA-Z0-9_]*',
-            'COMPARE': '==|!=|>|<|>=|<=',
+            'COMPARE': '==|!=|>=|<=|>|<',
             'COMMENT': r'//',
             'ASSIGN': '=',
             'OPERATION': r'\+|-|\*|\/|\^',
             'NUMBER': r'[+-]?([0-9]*[.])?[0-9]+',
-            'STRING': r'\".*?\"|\'.*?\'',
+            'STRING': r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'',
             'LPAREN': r'\(',
             'RPAREN': r'\)',
             'COMMA': r',',
             'LSQBRACE': r'\[',
             'RSQBRACE': r'\]',
-            'NEWLINE': r'\\n',
+            'LBRACE': r'\{',
+            'RBRACE': r'\}',
+            'COLON': r':',
+            'NEWLINE': r'\n',
             'DOT': r'\.',
         }
 
@@ -32,11 +52,13 @@ class Lexer:
             'array': 'ARRAY',
             'for': 'FOR',
             'to': 'TO',
+            'in': 'IN',
             'step': 'STEP',
             'next': 'NEXT',
             'break': 'BREAK',
             'continue': 'CONTINUE',
             'return': 'RETURN',
+            'import': 'IMPORT',
             'while': 'WHILE',
             'endwhile': 'ENDWHILE',
             'do': 'DO',
@@ -84,8 +106,11 @@ class Lexer:
                             token_type = self.keywords[match.group()]
                     case _:
                         pass
+                value = match.group()
+                if token_type == 'STRING': # escapes are resolved once, here
+                    value = value[0] + unescape(value[1:-1]) + value[-1]
                 self.tokens.append(
-                    {'type': token_type, 'value': match.group(), 'index': self.pos})
+                    {'type': token_type, 'value': value, 'index': self.pos})
                 break
         else:
             raise ValueError(
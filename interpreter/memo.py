@@ -0,0 +1,211 @@
+from collections import OrderedDict
+
+from . import FuncBlock, ExtName, NativeFunction, RuntimeVal, NumberVal, StringVal, BoolVal, NullVal
+from . import MK_STRING, MK_NULL
+
+DEFAULT_MEMO_SIZE = 1024
+
+# builtins whose result only depends on their arguments
+PURE_BUILTINS = {"str", "int", "float", "real", "bool", "dict", "range"}
+CONSTANT_NAMES = {"None", "true", "false"}
+
+# arguments that can make up a cache key, every one of them has an immutable python value
+KEY_TYPES = (NumberVal, StringVal, BoolVal, NullVal)
+
+
+def box_for(value: RuntimeVal):
+    """constructor to rebuild a cached result with, None if the result cannot be cached"""
+    if isinstance(value, StringVal):
+        return MK_STRING
+    if isinstance(value, NullVal):
+        return lambda _: MK_NULL()
+    if isinstance(value, (NumberVal, BoolVal)):
+        return type(value)
+    return None
+
+
+class MemoTable:
+    """size bounded LRU of the results of one function, keyed by its argument values"""
+
+    def __init__(self, name: str, size: int) -> None:
+        self.name = name
+        self.size = size
+        self.results: OrderedDict[tuple, tuple] = OrderedDict() # key: (box, python value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, arguments: list[RuntimeVal]) -> tuple | None:
+        """None when an argument is not hashable, such a call is not memoized"""
+        for argument in arguments:
+            if not isinstance(argument, KEY_TYPES):
+                return None
+        # the python type keeps 1, 1.0 and true apart, they are equal and hash the same
+        return tuple([(type(argument.value), argument.value) for argument in arguments])
+
+    def get(self, key: tuple) -> RuntimeVal | None:
+        entry = self.results.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.results.move_to_end(key)
+        box, value = entry
+        return box(value) # fresh value, the caller may change it
+
+    def put(self, key: tuple, result: RuntimeVal) -> None:
+        box = box_for(result)
+        if box is None:
+            return
+        self.results[key] = (box, result.value)
+        if len(self.results) > self.size:
+            self.results.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self.results.clear()
+
+    def stats(self) -> str:
+        return (f"memo {self.name}: hits={self.hits} misses={self.misses} "
+                f"evictions={self.evictions} size={len(self.results)}/{self.size}")
+
+
+class Memoizer:
+    """
+    memoization of user functions, kept on the root environment.
+    names: memoize exactly these functions without checking them,
+    None: memoize every function the purity check accepts
+    """
+
+    def __init__(self, size: int = DEFAULT_MEMO_SIZE, names: set[str] | None = None) -> None:
+        self.size = size
+        self.names = names
+        self.tables: dict[FuncBlock, MemoTable] = {}
+        # FuncBlock: (root bindings when checked, pure), rechecked once a callable is rebound
+        self.verdicts: dict[FuncBlock, tuple[int, bool]] = {}
+
+    def table_for(self, func_block: FuncBlock, env) -> MemoTable | None:
+        if self.names is not None:
+            if func_block.name not in self.names:
+                return None
+            return self.get_table(func_block)
+
+        root = env.root
+        verdict = self.verdicts.get(func_block)
+        if verdict is None or verdict[0] != root.bindings:
+            pure = is_pure(func_block, root)
+            self.verdicts[func_block] = (root.bindings, pure)
+            if verdict is not None and func_block in self.tables:
+                self.tables[func_block].clear() # a function it calls may have changed
+        elif not verdict[1]:
+            return None
+        else:
+            return self.tables[func_block]
+
+        return self.get_table(func_block) if pure else None
+
+    def get_table(self, func_block: FuncBlock) -> MemoTable:
+        table = self.tables.get(func_block)
+        if table is None:
+            table = self.tables[func_block] = MemoTable(func_block.name, self.size)
+        return table
+
+    def report(self) -> list[str]:
+        return [table.stats() for table in self.tables.values()]
+
+
+def is_pure(func_block: FuncBlock, root, visiting: set | None = None) -> bool:
+    """
+    True if the result of func_block only depends on its arguments: it reads nothing but its
+    own parameters and locals, never writes a global and only calls pure functions or builtins
+    """
+    if func_block.functype != 'FUNCTION':
+        return False
+    visiting = visiting or set()
+    visiting.add(func_block)
+    local_names = set(func_block.parameters or ())
+    collect_locals(func_block.body, local_names)
+    return all(is_pure_node(node, local_names, root, visiting) for node in func_block.body)
+
+
+def collect_locals(body: list, local_names: set[str]) -> None:
+    """every name the body assigns to, these live in the function's own frame"""
+    for node in body:
+        match node.get_type():
+            case 'AssignmentExpr' | 'ArrayAssignmentExpr':
+                if node.i_type != 'GLOBAL':
+                    local_names.add(node.left)
+            case 'ForBlock':
+                local_names.add(node.initialiser)
+                collect_locals(node.body, local_names)
+            case 'ForEachBlock':
+                local_names.add(node.name)
+                collect_locals(node.body, local_names)
+            case 'WhileBlock':
+                collect_locals(node.body, local_names)
+            case 'IfBlock':
+                for condition in node.conditions:
+                    collect_locals(condition.body, local_names)
+            case 'SwitchBlock':
+                for case in node.cases:
+                    collect_locals(case.body, local_names)
+                if node.default is not None:
+                    collect_locals(node.default.body, local_names)
+
+
+def is_pure_node(node, local_names: set[str], root, visiting: set) -> bool:
+    def check(*nodes) -> bool:
+        return all(child is None or is_pure_node(child, local_names, root, visiting) for child in nodes)
+
+    match node.get_type():
+        case 'NumericLiteral' | 'StringLiteral' | 'BreakStatement' | 'ContinueStatement':
+            return True
+        case 'Identifier':
+            return node.symbol in local_names or node.symbol in CONSTANT_NAMES
+        case 'AssignmentExpr':
+            return node.i_type != 'GLOBAL' and check(node.right)
+        case 'ArrayAssignmentExpr':
+            return node.i_type != 'GLOBAL' and check(node.right)
+        case 'ArrayIndex':
+            return node.array in local_names and check(node.index, node.right)
+        case 'BinaryExpr':
+            return check(node.left, node.right)
+        case 'UnaryExpr':
+            return check(node.right)
+        case 'ListExpression':
+            return check(*node.elements)
+        case 'DictExpression':
+            return check(*node.keys, *node.values)
+        case 'MemberExpr':
+            return check(node.name, node.arguments)
+        case 'ReturnStatement':
+            return check(node.value)
+        case 'FunctionCall':
+            return is_pure_callee(node.name, local_names, root, visiting) and check(node.arguments)
+        case 'ForBlock':
+            return check(node.initialising_expr, node.limit, node.step, *node.body)
+        case 'ForEachBlock':
+            return check(node.iterable, *node.body)
+        case 'WhileBlock':
+            return check(node.condition, *node.body)
+        case 'IfBlock':
+            return all(check(condition.condition, *condition.body) for condition in node.conditions)
+        case 'SwitchBlock':
+            cases = node.cases + ([node.default] if node.default is not None else [])
+            return check(node.subject) and all(check(case.label, *case.body) for case in cases)
+        case _: # nested function definitions and anything new are assumed impure
+            return False
+
+
+def is_pure_callee(name: str, local_names: set[str], root, visiting: set) -> bool:
+    if name in local_names: # a function passed in or assigned at run time
+        return False
+    scope = root.static_resolve(name, None) # the root or the builtins under it
+    callee = scope.variables[name] if scope is not None else None
+    if isinstance(callee, NativeFunction):
+        return callee.pure
+    if isinstance(callee, ExtName):
+        return name in PURE_BUILTINS
+    if isinstance(callee, FuncBlock):
+        return callee in visiting or is_pure(callee, root, visiting)
+    return False
@@ -0,0 +1,53 @@
+"""
+import "lib.ocr": binds the functions and procedures of another file into the importing environment.
+a module is parsed once per process and reused until its file changes
+"""
+import os
+import threading
+
+from . import Parser, Program, parse_text_from_file
+
+# absolute path: ((modification time, size) when parsed, parsed module)
+MODULES: dict[str, tuple[tuple[int, int], Program]] = {}
+MODULES_LOCK = threading.Lock()
+
+# the only statements a module may have at its top level
+MODULE_STATEMENTS = ('FuncBlock', 'ImportStatement')
+
+
+def load_module(path: str) -> Program:
+    """parsed module at path, from the cache unless the file changed since it was parsed"""
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with MODULES_LOCK:
+        cached = MODULES.get(path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    module = Parser().produce_ast(parse_text_from_file(path))
+    for statement in module.body:
+        if statement.get_type() not in MODULE_STATEMENTS:
+            raise SyntaxError(f"Module {path} can only define functions and procedures and import, "
+                              f"found {statement.get_type()}")
+    with MODULES_LOCK:
+        MODULES[path] = (version, module)
+    return module
+
+
+def import_module(path: str, env, directory: str | None = None, seen: set[str] | None = None) -> None:
+    """
+    bind the functions of the module at path (relative to directory, or to the working
+    directory like open()) into env, following the module's own imports
+    """
+    path = os.path.abspath(os.path.join(directory or os.getcwd(), path))
+    seen = seen if seen is not None else set()
+    if path in seen: # modules importing each other
+        return
+    seen.add(path)
+
+    module = load_module(path)
+    for statement in module.body:
+        if statement.get_type() == 'ImportStatement':
+            import_module(statement.path, env, os.path.dirname(path), seen)
+        else:
+            env.assign_var(statement.name, statement)
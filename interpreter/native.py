@@ -0,0 +1,157 @@
+"""
+Python functions callable from the language with declared parameter and return types.
+Arguments are unboxed and the result boxed once, through converters picked at registration:
+
+    from interpreter import native
+
+    @native("string", "int", returns="string", pure=True)
+    def repeat(text, times):
+        return text * times
+
+Extensions are python modules registering functions like this, loaded with --ext (see run.py)
+"""
+from collections.abc import Mapping, Sequence
+import importlib
+import os
+
+from . import ExtName, RuntimeVal, NumberVal, StringVal, BoolVal, ListVal, DictVal
+from . import MK_NUMBER, MK_STRING, MK_BOOL, MK_NULL, MK_LIST, MK_VALUE, get_value
+
+# name: NativeFunction, every function registered so far
+NATIVE_MODULES: dict = {}
+
+
+def unbox_as(cls: type, type_name: str, unbox=get_value):
+    def unboxer(argument: RuntimeVal):
+        if not isinstance(argument, cls):
+            raise TypeError(f"expected {type_name}, got {argument.get_type()}")
+        return unbox(argument)
+    return unboxer
+
+
+def unbox_int(argument: RuntimeVal) -> int:
+    if not isinstance(argument, NumberVal) or argument.value != int(argument.value):
+        raise TypeError(f"expected int, got {argument}")
+    return int(argument.value)
+
+
+class ValuesView(Sequence):
+    """
+    read-only view of the python values in a list argument: nothing is copied, an element is
+    unboxed when it is read. it follows the list if the program changes it later
+    """
+
+    def __init__(self, list_: ListVal) -> None:
+        self.list = list_
+
+    def __len__(self) -> int:
+        return self.list.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("list index out of range")
+        return self.list.get_index(index).value
+
+    def __iter__(self):
+        return self.list.python_values()
+
+
+class MappingView(Mapping):
+    """read-only view of a dict argument, keys and unboxed values, nothing is copied"""
+
+    def __init__(self, dict_: DictVal) -> None:
+        self.dict = dict_
+
+    def __getitem__(self, key):
+        return self.dict.value[key].value
+
+    def __iter__(self):
+        return iter(self.dict.value)
+
+    def __len__(self) -> int:
+        return len(self.dict.value)
+
+
+# declared parameter type -> RuntimeVal to python value
+UNBOXERS = {
+    "number": unbox_as(NumberVal, "number"),
+    "int": unbox_int,
+    "string": unbox_as(StringVal, "string"),
+    "bool": unbox_as(BoolVal, "bool"),
+    "list": unbox_as(ListVal, "list", ValuesView),
+    "dict": unbox_as(DictVal, "dict", MappingView),
+    "any": lambda argument: argument, # the value itself, nothing is copied
+}
+
+# declared return type -> python value to RuntimeVal
+BOXERS = {
+    "number": MK_NUMBER,
+    "int": MK_NUMBER,
+    "string": MK_STRING,
+    "bool": MK_BOOL,
+    "list": lambda value: MK_LIST([MK_VALUE(element) for element in value]),
+    "null": lambda value: MK_NULL(),
+    "any": lambda value: value, # the function builds its own RuntimeVal
+}
+
+
+class NativeFunction(ExtName):
+    def __init__(self, name: str, function, parameters: tuple[str, ...], returns: str = "null", pure: bool = False) -> None:
+        super().__init__(function)
+        for type_name in parameters:
+            if type_name not in UNBOXERS:
+                raise TypeError(f"native function {name}: unknown parameter type {type_name}")
+        if returns not in BOXERS:
+            raise TypeError(f"native function {name}: unknown return type {returns}")
+        self.name = name
+        self.parameters = parameters
+        self.returns = returns
+        self.pure = pure # only depends on its arguments, lets callers be memoized
+        self.unboxers = tuple(UNBOXERS[type_name] for type_name in parameters)
+        self.box = BOXERS[returns]
+
+    def call(self, arguments: list[RuntimeVal]) -> RuntimeVal:
+        if len(arguments) != len(self.unboxers):
+            raise RuntimeError(f"Incorrect amount of arguments to {self.name}, expected {len(self.unboxers)}, got {len(arguments)}")
+        try:
+            values = [unbox(argument) for unbox, argument in zip(self.unboxers, arguments)]
+        except TypeError as error:
+            raise TypeError(f"{self.name}: {error}") from None
+        return self.box(self.value(*values))
+
+    def get_type(self) -> str:
+        return 'EXT_NAME'
+
+
+def register_native(name: str, function, parameters: tuple[str, ...], returns: str = "null", pure: bool = False) -> NativeFunction:
+    native_function = NativeFunction(name, function, tuple(parameters), returns, pure)
+    NATIVE_MODULES[name] = native_function
+    return native_function
+
+
+def native(*parameters: str, returns: str = "null", name: str | None = None, pure: bool = False):
+    """decorator registering a python function, the function itself is returned unchanged"""
+    def register(function):
+        register_native(name or function.__name__, function, parameters, returns, pure)
+        return function
+    return register
+
+
+def load_extension(extension: str) -> None:
+    """import a module (dotted name or path to a .py file) so its @native functions register"""
+    if extension.endswith(".py"):
+        import importlib.util
+        module_name = os.path.splitext(os.path.basename(extension))[0]
+        spec = importlib.util.spec_from_file_location(module_name, extension)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    else:
+        importlib.import_module(extension)
+
+
+def get_native_modules() -> dict:
+    return dict(NATIVE_MODULES)
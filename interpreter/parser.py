@@ -1,8 +1,8 @@
 from interpreter.ast import ArrayAssignmentExpr
-from . import Statement, Program
-from . import Expression, AssignmentExpr, BinaryExpr, UnaryExpr, ListExpression, FunctionCall, MemberExpr
+from . import Statement, Program, BreakStatement, ContinueStatement, ReturnStatement, ImportStatement
+from . import Expression, AssignmentExpr, BinaryExpr, UnaryExpr, ListExpression, DictExpression, FunctionCall, MemberExpr
 from . import Identifier, NumericLiteral, StringLiteral, ArrayIndex
-from . import Block, IfStatement, IfBlock, IfBlock, ForBlock, FuncBlock, WhileBlock, SwitchBlock, CaseBlock
+from . import Block, IfStatement, IfBlock, IfBlock, ForBlock, ForEachBlock, FuncBlock, WhileBlock, SwitchBlock, CaseBlock
 from . import Lexer
 from . import ArrayAssignmentExpr
 
@@ -10,6 +10,8 @@ from . import ArrayAssignmentExpr
 class Parser:
     def __init__(self) -> None:
         self.tokens: Lexer | None = None
+        self.loop_depth = 0 # break/continue are only valid inside a loop
+        self.functype: str | None = None # FUNCTION/PROCEDURE being parsed, for return
 
     def produce_ast(self, source) -> Program:
         self.tokens = Lexer(source)
@@ -60,10 +62,18 @@ class Parser:
                 return self.__parse_for_block()
             case 'WHILE':
                 return self.__parse_while_block()
+            case 'SWITCH':
+                return self.__parse_switch_block()
             case 'FUNCTION':
                 return self.__parse_func_block('FUNCTION')
             case 'PROCEDURE':
                 return self.__parse_func_block('PROCEDURE')
+            case 'BREAK' | 'CONTINUE':
+                return self.__parse_loop_control()
+            case 'RETURN':
+                return self.__parse_return()
+            case 'IMPORT':
+                return self.__parse_import()
             case 'NEWLINE':
                 self.next_token()
                 return -1 # code for: this is nothing
@@ -76,9 +86,41 @@ class Parser:
             if res == -1:
                 continue
             block.body_append(res)
+
+    def __parse_loop_body(self, block: Block, terminators: tuple[str]):
+        self.loop_depth += 1
+        self.__parse_block(block, terminators)
+        self.loop_depth -= 1
+
+    def __parse_loop_control(self) -> Statement:
+        keyword = self.next_token()['value']
+        if self.loop_depth == 0:
+            raise SyntaxError(f'"{keyword}" outside of a loop')
+        self.new_line_or_eof()
+        return BreakStatement() if keyword == 'break' else ContinueStatement()
+
+    def __parse_return(self) -> ReturnStatement:
+        self.next_token() # discard 'RETURN'
+        if self.functype is None:
+            raise SyntaxError('"return" outside of a function')
+        if self.at()['type'] in ('NEWLINE', 'EOF'):
+            return ReturnStatement()
+        if self.functype == 'PROCEDURE': # procedure cannot return a value
+            raise SyntaxError("Procedure cannot return a value")
+        value = self.__parse_expression()
+        self.new_line_or_eof()
+        return ReturnStatement(value=value)
         
-    def __parse_for_block(self) -> ForBlock:
+    def __parse_import(self) -> ImportStatement:
+        self.next_token() # discard 'IMPORT'
+        path = StringLiteral(value=self.expect('STRING', 'Expected a file name after "import"')['value']).value
+        self.new_line_or_eof()
+        return ImportStatement(path)
+
+    def __parse_for_block(self) -> ForBlock | ForEachBlock:
         self.next_token() # discard 'FOR'
+        if self.look_forward()['type'] == 'IN':
+            return self.__parse_for_each_block()
         initialiser = self.at()['value']
         initialising_expr = self.__parse_assignment_expression()
         self.expect('TO', 'Expected "to"') # discard 'TO'
@@ -92,21 +134,66 @@ class Parser:
             for_block.step = step
         self.expect('NEWLINE', 'Expected newline after "for"') # discard 'NEWLINE'
         
-        self.__parse_block(for_block, ('NEXT',))
+        self.__parse_loop_body(for_block, ('NEXT',))
         self.next_token() # discard 'NEXT'
         self.__parse_expression()
         self.new_line_or_eof()
         return for_block
     
+    def __parse_for_each_block(self) -> ForEachBlock:
+        name = self.expect('NAME', 'Expected loop variable')['value']
+        self.next_token() # discard 'IN'
+        iterable = self.__parse_expression()
+        self.expect('NEWLINE', 'Expected newline after "for"') # discard 'NEWLINE'
+        for_each_block = ForEachBlock(name, iterable)
+
+        self.__parse_loop_body(for_each_block, ('NEXT',))
+        self.next_token() # discard 'NEXT'
+        self.__parse_expression()
+        self.new_line_or_eof()
+        return for_each_block
+
     def __parse_while_block(self) -> WhileBlock:
         self.next_token() # discard 'WHILE'
         condition = self.__parse_expression()
         while_block = WhileBlock(condition)
         self.expect('NEWLINE', 'Expected newline after "while"') # discard 'NEWLINE'
-        self.__parse_block(while_block, ('ENDWHILE',))
+        self.__parse_loop_body(while_block, ('ENDWHILE',))
         self.next_token() # discard 'ENDWHILE'
         self.new_line_or_eof()
         return while_block
+
+    def __parse_switch_block(self) -> SwitchBlock:
+        self.next_token() # discard 'SWITCH'
+        subject = self.__parse_expression()
+        self.expect('COLON', 'Expected ":" after switch')
+        self.expect('NEWLINE', 'Expected newline after "switch"')
+        switch_block = SwitchBlock(subject)
+        terminators = ('CASE', 'DEFAULT', 'ENDSWITCH', 'EOF')
+        while self.at()['type'] != 'ENDSWITCH':
+            match self.at()['type']:
+                case 'NEWLINE':
+                    self.next_token()
+                    continue
+                case 'CASE':
+                    self.next_token() # discard 'CASE'
+                    case_block = CaseBlock(label=self.__parse_expression())
+                case 'DEFAULT':
+                    self.next_token() # discard 'DEFAULT'
+                    if switch_block.default is not None:
+                        raise SyntaxError('switch has more than one default')
+                    case_block = CaseBlock()
+                case _:
+                    raise SyntaxError('Unable to find terminator of switch: missing case, default or endswitch')
+            self.expect('COLON', 'Expected ":" after case')
+            self.expect('NEWLINE', 'Expected newline after case')
+            self.__parse_block(case_block, terminators)
+            switch_block.add_case(case_block)
+
+        self.next_token() # discard 'ENDSWITCH'
+        self.new_line_or_eof()
+        switch_block.build_table()
+        return switch_block
  
     def __parse_if_block(self):
         if_block = IfBlock()
@@ -133,24 +220,19 @@ class Parser:
         name = self.expect('NAME', 'Expected function name')['value']
         self.expect('LPAREN', 'Expected "("') # discard 'LPAREN'
         parameters = self.__parse_parameters()
-        print(parameters)
         self.expect('RPAREN', 'Expected ")"') # discard 'RPAREN'
         self.expect('NEWLINE', 'Expected newline after function header') # discard 'NEWLINE'
-        func_block = FuncBlock(name=name, parameters = parameters)
-        self.__parse_block(func_block, terminators=('END'+functype, 'RETURN'))
-        if self.at()['type'] == 'RETURN': # discard "RETURN"
-            if functype == "PROCEDURE": # procedure cannot return a value
-                raise SyntaxError("Procedure cannot return a value")
-            self.next_token()
-            return_expr = self.__parse_expression() # parse return expression
-            func_block.return_expr = return_expr
-            print(self.at())
-            if self.at()['type'] == "EOF":
-                raise SyntaxError(f'Expected subroutine terminator(end{functype.lower()}), instead unexpected EOF')
-            next_token = self.next_token()
+        func_block = FuncBlock(name=name, parameters = parameters, functype=functype)
+
+        outer = self.loop_depth, self.functype
+        self.loop_depth, self.functype = 0, functype
+        self.__parse_block(func_block, terminators=('END'+functype, 'EOF'))
+        self.loop_depth, self.functype = outer
+
+        if self.at()['type'] == "EOF":
+            raise SyntaxError(f'Expected subroutine terminator(end{functype.lower()}), instead unexpected EOF')
         self.expect('END'+functype, 'Expected end'+functype.lower()) # discard 'END'+functype
         self.new_line_or_eof()
-            
 
         return func_block
         
@@ -201,6 +283,8 @@ class Parser:
 
     def __parse_parameters(self) -> list[str]:
         params = []
+        if self.at()['type'] == 'RPAREN':
+            return params
         while True:
             params.append(self.next_token()['value'])
             if self.at()['type'] == 'RPAREN':
@@ -225,6 +309,18 @@ class Parser:
         list_expr = ListExpression(elements = elems)
         return list_expr
 
+    def __parse_dict_expression(self) -> DictExpression:
+        keys, values = [], []
+        while self.at()['type'] != 'RBRACE':
+            keys.append(self.__parse_expression())
+            self.expect('COLON', 'Expected ":"')
+            values.append(self.__parse_expression())
+            if self.at()['type'] == 'RBRACE':
+                break
+            self.expect('COMMA', 'Expected ","')
+
+        return DictExpression(keys=keys, values=values)
+
     def __parse_name(self, i_type="VAR"):
         next_level = self.__parse_logical_expression
         tk = self.at()
@@ -258,7 +354,12 @@ class Parser:
                 return AssignmentExpr(left=left, right=right, i_type=i_type) 
 
             case _:
-                return next_level()
+                left = next_level()
+                if isinstance(left, ArrayIndex) and self.at()['type'] == "ASSIGN":
+                    self.next_token() # discard ASSIGN
+                    right: Expression = next_level()
+                    return ArrayIndex(array=left.array, index=left.index, right=right, assign=True)
+                return left
 
     def __parse_assignment_expression(self) -> Expression:
         tk: dict = self.at()
@@ -315,7 +416,7 @@ class Parser:
 
     def __parse_multiplicative_expression(self) -> Expression:
         """Multiplicative expression: 10 * 4 / 5"""
-        next_level = self.__parse_dot_expression
+        next_level = self.__parse_unary_expression
         left = next_level()
         while self.at()['value'] in ('/', '*', 'DIV', 'MOD'):
             operator = self.next_token()['value']
@@ -326,7 +427,7 @@ class Parser:
         return left
     
     def __parse_dot_expression(self) -> Expression:
-        next_level = self.__parse_unary_expression
+        next_level = self.__parse_primary_expression
         left = next_level()
         while self.at()['value'] == '.':
             self.next_token() # discard DOT
@@ -335,16 +436,16 @@ class Parser:
             if at['type'] == "LPAREN": # method
                 self.next_token() 
             else:
-                return MemberExpr(name=left, method = method, arguments=ListExpression(elements=None), is_attribute=True)
+                left = MemberExpr(name=left, method = method, arguments=ListExpression(elements=None), is_attribute=True)
+                continue
             args = self.__parse_list_expression(terminator="RPAREN")
             self.expect("RPAREN", "Expected ')'") # discard RPAREN
-            expr = MemberExpr(name=left, method=method, arguments=args) 
-            return expr
+            left = MemberExpr(name=left, method=method, arguments=args) # chained calls keep going
         return left
 
     def __parse_unary_expression(self) -> Expression:
         tk: dict = self.at()
-        next_level = self.__parse_primary_expression
+        next_level = self.__parse_dot_expression # NOT f.endOfFile() negates the call
         match tk['type']:
             case 'NEG':
                 operator = tk['value']
@@ -402,6 +503,11 @@ class Parser:
                 value = self.__parse_list_expression(terminator="RSQBRACE")
                 self.expect('RSQBRACE', 'Expected "]"')
                 return value
+
+            case 'LBRACE':
+                value = self.__parse_dict_expression()
+                self.expect('RBRACE', 'Expected "}"')
+                return value
             # case 'NULL':
             #     return NullLiteral()
             case _:
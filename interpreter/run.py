@@ -1,48 +1,137 @@
 import sys
 
 from . import parse_text_from_file
-from . import Parser
 from . import evaluate
 from . import Environment
-from . import NumberVal
-from . import MK_NUMBER, MK_NULL, MK_BOOL, ExtName
-from . import get_default_modules
+from . import MK_NULL, MK_BOOL, ExtName
+from . import get_default_modules, get_native_modules, load_extension
+from . import Streams
 
 import time
-def run_file(lines: str, env: Environment) -> None:
-    """Run file"""
+
+# the builtins every program runs on top of, built once and frozen (see builtins_env)
+BUILTINS: Environment | None = None
+# the native functions BUILTINS was built with
+BUILTIN_NATIVES: dict = {}
+
+
+def run_file(lines: str, env: Environment, timings: dict[str, float] | None = None) -> None:
+    """Run file, timings (when given) also gets how long parsing took"""
+    start = time.perf_counter()
+    from . import Parser # the parser and lexer are only loaded once something has to be parsed
     parser = Parser()
     program = parser.produce_ast(lines)
+    if timings is not None:
+        timings['parse'] = time.perf_counter() - start
+        report_startup(timings)
     start = time.perf_counter()
-    result = evaluate(program, env)
+    try:
+        result = evaluate(program, env)
+        if result.value is not None:
+            env.streams.print(result)
+    finally:
+        env.streams.flush()
     end = time.perf_counter()
-    if result.value is not None:
-        print(result)
     
     print(f"runtime: {end - start}")
+    if env.memo is not None:
+        for line in env.memo.report():
+            print(line)
     
     # print(program.build())
 
 
-def setup_env() -> Environment:
-    """Setup environment"""
-    default_modules = get_default_modules()
+def builtins_env() -> Environment:
+    """
+    frozen environment of the builtins shared by every program, built on first use and
+    again only if more native functions were registered since
+    """
+    global BUILTINS, BUILTIN_NATIVES
+    natives = get_native_modules()
+    if BUILTINS is not None and natives == BUILTIN_NATIVES:
+        return BUILTINS
+
     env = Environment()
-    for key, value in default_modules.items():
-        env.declare_var(key, ExtName(value))
+    for key, value in get_default_modules().items():
+        env.declare_var(key, value if isinstance(value, ExtName) else ExtName(value))
+    for key, value in natives.items(): # registered by extensions, may replace a default
+        env.assign_var(key, value)
     env.declare_var('None', MK_NULL())
     env.declare_var('true', MK_BOOL(True))
     env.declare_var('false', MK_BOOL(False))
+    BUILTINS, BUILTIN_NATIVES = env.freeze(), natives
+    return BUILTINS
+
+
+def setup_env(streams: Streams | None = None, parent: Environment | None = None) -> Environment:
+    """
+    Setup environment, print and input use streams (standard input and output by default).
+    parent is a frozen environment to build on, the builtins unless given
+    """
+    env = Environment(parent or builtins_env())
+    env.streams = streams or Streams()
+    # every program prints to its own streams, so these two are not among the shared builtins
+    env.declare_var('print', ExtName(env.streams.print))
+    env.declare_var('input', ExtName(env.streams.input))
     return env
 
 
+def parse_options(args: list[str]) -> tuple[list[str], dict[str, str]]:
+    """split --name=value options from the positional arguments"""
+    positional, options = [], {}
+    for arg in args:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+        else:
+            positional.append(arg)
+    return positional, options
+
+
+def setup_memo(env: Environment, options: dict[str, str]) -> None:
+    """
+    --memo: memoize every function found to be pure
+    --memo=fib,paths: memoize these functions, without checking them
+    --memo-size=N: results kept per function, least recently used go first
+    """
+    if 'memo' not in options:
+        return
+    from . import Memoizer, DEFAULT_MEMO_SIZE
+    names = set(options['memo'].split(',')) if options['memo'] else None
+    size = int(options.get('memo-size') or DEFAULT_MEMO_SIZE)
+    env.memo = Memoizer(size, names)
+
+
+def setup_streams(options: dict[str, str]) -> Streams:
+    """
+    --output-buffer=N: characters of output written at a time, 0 writes every print straight away
+    --input=path: read input() lines from a file instead of standard input
+    """
+    buffer_size = int(options['output-buffer']) if options.get('output-buffer') else None
+    input_file = open(options['input']) if options.get('input') else None
+    return Streams(input_file=input_file, buffer_size=buffer_size)
+
+
+def report_startup(timings: dict[str, float]) -> None:
+    """--startup-time: where the time before the program's first statement went"""
+    print("startup: " + ", ".join(f"{phase} {seconds * 1000:.2f}ms" for phase, seconds in timings.items())
+          + f", total {sum(timings.values()) * 1000:.2f}ms", file=sys.stderr)
+
+
 def run_command() -> None:
     """Run command"""
-    args = sys.argv
+    from . import IMPORT_TIME
+    args, options = parse_options(sys.argv)
+    # --startup-time: report import, setup and parse times on standard error
+    timings = {'import': IMPORT_TIME} if 'startup-time' in options else None
+    # --ext=module,path/to/file.py: python extensions registering @native functions
+    for extension in filter(None, options.get('ext', '').split(',')):
+        load_extension(extension)
     if len(args) <= 1:
         print("no file found, interactive shell launched")
         print("====diddy=====")
-        env = setup_env()
+        env = setup_env(setup_streams(options))
+        setup_memo(env, options)
         while True:
             line = input('>>> ')
             if line == 'exit':
@@ -51,7 +140,11 @@ def run_command() -> None:
             run_file(line, env)
     else:
         filename = args[1]
+        start = time.perf_counter()
         lines = parse_text_from_file(filename)
 
-        env = setup_env()
-        run_file(lines, env)
+        env = setup_env(setup_streams(options))
+        setup_memo(env, options)
+        if timings is not None:
+            timings['setup'] = time.perf_counter() - start
+        run_file(lines, env, timings)
@@ -0,0 +1,81 @@
+import io
+import sys
+
+from . import MK_STRING, StringVal
+
+# characters of output collected before they are written, when the output is not a terminal
+OUTPUT_BUFFER_SIZE = 1 << 16
+
+
+class Streams:
+    """
+    where print and input of a program go, kept on the root environment (env.streams).
+    output is collected and written a block at a time, input comes from a file object or from
+    lines given up front; capture=True keeps the output in memory for getvalue()
+
+        streams = Streams(input_lines=["3", "4"], capture=True)
+        env = setup_env(streams)
+    """
+
+    def __init__(self, output=None, input_file=None, input_lines=None, buffer_size: int | None = None,
+                 capture: bool = False) -> None:
+        self.output = io.StringIO() if capture else (output or sys.stdout)
+        self.input_file = input_file or sys.stdin
+        self.input_lines = None if input_lines is None else iter(input_lines)
+        if buffer_size is None:
+            # someone watching a terminal wants every line as it is printed
+            buffer_size = 0 if is_terminal(self.output) else OUTPUT_BUFFER_SIZE
+        self.buffer_size = buffer_size
+        self.pending: list[str] = []
+        self.pending_size = 0
+
+    def write(self, text: str) -> None:
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.pending_size >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self.pending:
+            self.output.write("".join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+        self.output.flush()
+
+    def drain(self) -> str:
+        """take the output not written yet, for hosts that deliver it themselves (see suspend.py)"""
+        text = "".join(self.pending)
+        self.pending = []
+        self.pending_size = 0
+        return text
+
+    def print(self, *values) -> None:
+        self.write(" ".join(map(str, values)) + "\n")
+
+    def input(self, prompt=None) -> StringVal:
+        if prompt is not None:
+            self.write(str(prompt))
+        self.flush() # the prompt and everything before it show up before waiting
+
+        if self.input_lines is not None:
+            line = next(self.input_lines, None)
+            if line is None:
+                raise EOFError("No more input")
+            return MK_STRING(line)
+
+        line = self.input_file.readline()
+        if not line:
+            raise EOFError("No more input")
+        return MK_STRING(line.rstrip("\n"))
+
+    def getvalue(self) -> str:
+        """everything printed so far, for capture=True"""
+        self.flush()
+        return self.output.getvalue()
+
+
+def is_terminal(output) -> bool:
+    try:
+        return output.isatty()
+    except (AttributeError, ValueError):
+        return False
@@ -0,0 +1,356 @@
+"""
+Evaluator that can stop in the middle of a program and carry on later, so one asyncio loop can
+host many running programs. Every run_* function here is a generator: it yields a request to
+whoever drives it and is resumed with the answer
+
+    ("input", None)   the program called input(), send back the line (a str)
+    ("output", None)  printed output has piled up in env.streams, drain it and send None
+
+Only a statement or expression containing a function call can get to input() or print(),
+anything else is handed to the ordinary evaluator in one go.
+"""
+import asyncio
+import sys
+import weakref
+
+from . import ExtName, RuntimeVal, NumberVal, Environment, Program, Streams
+from . import MK_NULL, MK_BOOL, MK_STRING, MK_LIST, MK_DICT, MK_NUMBER
+from . import evaluate, evaluate_condition, eval_numeric_binop, end_iteration, evaluate_function
+from . import assign_value, member_function, resolve_index, store_index, find_callable, call_external
+from . import COMPARISONS
+from . import setup_env
+
+# printed characters a program may pile up before it stops to let them be delivered
+SUSPEND_OUTPUT_SIZE = 1 << 12
+
+# node: True if a function call is somewhere inside it, worked out once per node
+CALLS: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def suspends(node) -> bool:
+    found = CALLS.get(node)
+    if found is None:
+        found = CALLS[node] = any(map(suspends, children(node))) or node.get_type() == 'FunctionCall'
+    return found
+
+
+def children(node) -> list:
+    match node.get_type():
+        case 'Program':
+            return [*node.body]
+        case 'WhileBlock':
+            return [node.condition, *node.body]
+        case 'FunctionCall':
+            return [*node.arguments.elements]
+        case 'BinaryExpr':
+            return [node.left, node.right]
+        case 'UnaryExpr':
+            return [node.right]
+        case 'MemberExpr':
+            return [node.name, *node.arguments.elements]
+        case 'ArrayIndex':
+            return [node.index] + ([node.right] if node.right is not None else [])
+        case 'ListExpression':
+            return [*node.elements]
+        case 'DictExpression':
+            return [*node.keys, *node.values]
+        case 'AssignmentExpr' | 'ArrayAssignmentExpr':
+            return [node.right]
+        case 'ReturnStatement':
+            return [] if node.value is None else [node.value]
+        case 'ForBlock':
+            return [node.initialising_expr, node.limit, node.step, *node.body]
+        case 'ForEachBlock':
+            return [node.iterable, *node.body]
+        case 'IfBlock':
+            return [child for condition in node.conditions
+                    for child in ([condition.condition] if condition.condition is not None else []) + condition.body]
+        case 'SwitchBlock':
+            cases = node.cases + ([node.default] if node.default is not None else [])
+            return [node.subject] + [child for case in cases
+                                     for child in ([case.label] if case.label is not None else []) + case.body]
+    return [] # literals, names, break/continue and function definitions call nothing
+
+
+def run_program(program, env: Environment):
+    last_evaluated: RuntimeVal = MK_NULL()
+    for statement in program.body:
+        last_evaluated = yield from run(statement, env)
+        if env.signal is not None:
+            break
+    return last_evaluated
+
+
+def run(node, env: Environment):
+    if not suspends(node):
+        return evaluate(node, env)
+
+    match node.get_type():
+        case 'Program':
+            return (yield from run_program(node, env))
+        case 'IfBlock':
+            return (yield from run_if_block(node, env))
+        case 'ForBlock':
+            return (yield from run_for_block(node, env))
+        case 'ForEachBlock':
+            return (yield from run_for_each_block(node, env))
+        case 'WhileBlock':
+            return (yield from run_while_block(node, env))
+        case 'SwitchBlock':
+            return (yield from run_switch_block(node, env))
+        case 'FunctionCall':
+            return (yield from run_function_call(node, env))
+        case 'AssignmentExpr' | 'ArrayAssignmentExpr':
+            return assign_value(node, (yield from run(node.right, env)), env)
+        case 'ReturnStatement':
+            env.return_value = yield from run(node.value, env)
+            env.signal = 'RETURN'
+            return env.return_value
+        case 'BinaryExpr':
+            if node.binop_type == 'BOOLEAN':
+                return MK_BOOL((yield from run_condition(node, env)))
+            left = yield from run(node.left, env)
+            right = yield from run(node.right, env)
+            if node.binop_type == 'NUMERIC':
+                return eval_numeric_binop(left, right, node.operator)
+            return MK_NULL()
+        case 'UnaryExpr':
+            if node.operator == 'NOT':
+                return MK_BOOL(not (yield from run_condition(node.right, env)))
+            return None
+        case 'MemberExpr':
+            object_ = yield from run(node.name, env)
+            function = member_function(node, object_)
+            if node.is_attribute:
+                return function(object_)
+            return function(object_, *(yield from run_all(node.arguments.elements, env)))
+        case 'ArrayIndex':
+            return (yield from run_array_index(node, env))
+        case 'ListExpression':
+            return MK_LIST((yield from run_all(node.elements, env)))
+        case 'DictExpression':
+            dict_ = MK_DICT()
+            for key, value in zip(node.keys, node.values):
+                key = dict_.hash_key((yield from run(key, env)))
+                dict_.set_index(key, (yield from run(value, env)))
+            return dict_
+    raise TypeError('Invalid AST node type ' + node.get_type())
+
+
+def run_all(nodes: list, env: Environment):
+    values = []
+    for node in nodes:
+        values.append((yield from run(node, env)))
+    return values
+
+
+def run_condition(expr, env: Environment):
+    if not suspends(expr):
+        return evaluate_condition(expr, env)
+
+    if expr.get_type() == 'BinaryExpr':
+        compare = COMPARISONS.get(expr.operator)
+        if compare is not None:
+            left = yield from run(expr.left, env)
+            right = yield from run(expr.right, env)
+            return compare(left.value, right.value)
+        if expr.operator == 'AND':
+            return (yield from run_condition(expr.left, env)) and (yield from run_condition(expr.right, env))
+        if expr.operator == 'OR':
+            return (yield from run_condition(expr.left, env)) or (yield from run_condition(expr.right, env))
+    elif expr.get_type() == 'UnaryExpr' and expr.operator == 'NOT':
+        return not (yield from run_condition(expr.right, env))
+
+    return bool((yield from run(expr, env)).value)
+
+
+def run_body(block, env: Environment):
+    """one pass over a loop body, True when the loop has to stop"""
+    for statement in block.body:
+        yield from run(statement, env)
+        if env.signal is not None:
+            break
+    return env.signal is not None and end_iteration(env)
+
+
+def run_if_block(if_block, env: Environment):
+    for curr_condition in if_block.conditions:
+        if curr_condition.condition is None or (yield from run_condition(curr_condition.condition, env)):
+            return (yield from run_program(curr_condition, env))
+    return MK_NULL()
+
+
+def run_for_block(for_block, env: Environment):
+    start = (yield from run(for_block.initialising_expr, env)).value
+    step = (yield from run(for_block.step, env)).value or 1
+    limit = (yield from run(for_block.limit, env)).value
+    name = for_block.initialiser
+
+    if type(start) is int and type(step) is int and type(limit) is int:
+        iterations = range(start, limit, step)
+        for i in iterations:
+            env.variables[name] = NumberVal(i)
+            if (yield from run_body(for_block, env)):
+                break
+        else:
+            env.variables[name] = NumberVal(start + len(iterations) * step)
+        return MK_NULL()
+
+    while env.get_var(name).value != limit:
+        if (yield from run_body(for_block, env)):
+            break
+        env.assign_var(name, MK_NUMBER(env.get_var(name).value + step))
+    return MK_NULL()
+
+
+def run_for_each_block(for_each_block, env: Environment):
+    collection = yield from run(for_each_block.iterable, env)
+    try:
+        iterator = iter(collection)
+    except TypeError:
+        raise TypeError(f"{collection} is not iterable") from None
+
+    name = for_each_block.name
+    if name in env.constants:
+        raise ValueError(f'Cannot modify value, Variable {name} is constant')
+    env.track_binding(name, None)
+
+    for item in iterator:
+        env.variables[name] = item
+        if (yield from run_body(for_each_block, env)):
+            break
+    return MK_NULL()
+
+
+def run_while_block(while_block, env: Environment):
+    while (yield from run_condition(while_block.condition, env)):
+        if (yield from run_body(while_block, env)):
+            break
+    return MK_NULL()
+
+
+def run_switch_block(switch_block, env: Environment):
+    subject = (yield from run(switch_block.subject, env)).value
+    case = switch_block.default
+    if switch_block.table is not None:
+        try:
+            case = switch_block.table.get(subject, switch_block.default)
+        except TypeError:
+            pass
+    else:
+        for candidate in switch_block.cases:
+            if (yield from run(candidate.label, env)).value == subject:
+                case = candidate
+                break
+
+    if case is None:
+        return MK_NULL()
+    return (yield from run_program(case, env))
+
+
+def run_array_index(expr, env: Environment):
+    array = env.get_var(expr.array)
+    cache = expr.cache
+    if cache is None or cache[0] is not type(array):
+        cache = resolve_index(expr, array)
+    _, key_types, get_index, set_index = cache
+
+    index = yield from run(expr.index, env)
+    if not isinstance(index, key_types):
+        raise RuntimeError(f"Index {expr.index} is not valid, index={index}")
+    if not expr.assign:
+        return get_index(array, index.value)
+    if set_index is None:
+        raise TypeError(f"Name {expr.array} is not a mutable iterable")
+    return store_index(array, set_index, index, (yield from run(expr.right, env)))
+
+
+def run_function_call(function_call, env: Environment):
+    func_block = find_callable(function_call, env)
+    arguments = yield from run_all(function_call.arguments.elements, env)
+
+    if isinstance(func_block, ExtName):
+        streams = env.root.streams
+        if func_block.value == streams.input:
+            if arguments:
+                streams.write(str(arguments[0]))
+            return MK_STRING((yield ("input", None)))
+
+        result = call_external(func_block, arguments)
+        if streams.pending_size >= SUSPEND_OUTPUT_SIZE:
+            yield ("output", None)
+        return result
+
+    memo = env.root.memo
+    if memo is not None and memo.table_for(func_block, env) is not None:
+        return evaluate_function(func_block, arguments, env) # pure, cannot print or ask for input
+
+    parameters = func_block.parameters
+    if len(parameters) != len(arguments):
+        raise RuntimeError(f"Incorrect amount of arguments, expected {len(parameters)}, got {len(arguments)}")
+    frame = Environment.acquire(env, dict(zip(parameters, arguments)))
+    try:
+        yield from run_program(func_block, frame)
+        if frame.signal == 'RETURN':
+            return frame.return_value
+        return MK_NULL()
+    finally:
+        frame.release()
+
+
+class Session:
+    """
+    one run of a program that stops at input() and whenever printed output piles up,
+    instead of blocking a thread. many sessions can share one asyncio loop:
+
+        session = Session(program)
+        await session.run(read_line, write)
+
+    or be driven by hand: resume() runs up to the next stop and says why it stopped
+    """
+
+    def __init__(self, program: Program, streams: Streams | None = None) -> None:
+        # output stays pending until drained at a stop, nothing is written behind the host's back
+        self.streams = streams or Streams(capture=True, buffer_size=sys.maxsize)
+        self.env = setup_env(self.streams)
+        self.steps = run_program(program, self.env)
+        self.result: RuntimeVal | None = None
+        self.request: str | None = None # why the program last stopped
+        self.done = False
+
+    def resume(self, line: str | None = None) -> tuple[str, str]:
+        """
+        carry on until the program stops again, line answers the input() it stopped at
+        (None there means end of input). returns ("input" | "output" | "done", text printed since)
+        """
+        try:
+            if line is None and self.request == "input":
+                request, _ = self.steps.throw(EOFError("No more input"))
+            else:
+                request, _ = self.steps.send(line)
+        except StopIteration as stop:
+            self.done = True
+            self.result = stop.value
+            request = "done"
+        self.request = request
+        return request, self.streams.drain()
+
+    async def run(self, read_line, write) -> RuntimeVal:
+        """
+        read_line: coroutine function giving the next line of input, None or "" at the end
+        write: coroutine function delivering printed text
+        """
+        line = None
+        while True:
+            request, output = self.resume(line)
+            if output:
+                await write(output)
+            if request == "done":
+                return self.result
+            if request == "input":
+                line = (await read_line()) or None
+                if line is not None:
+                    line = line.rstrip("\n")
+            else:
+                line = None
+                await asyncio.sleep(0) # let the other sessions have a turn
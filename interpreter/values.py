@@ -1,10 +1,35 @@
-from typing import Any, Self
-import re
+from __future__ import annotations
+
+TYPE_CHECKING = False # typing takes longer to import than the whole interpreter, annotations only need it for checkers
+if TYPE_CHECKING:
+    from typing import Any, Self
+
+from array import array
+from itertools import islice
+from operator import attrgetter, countOf, indexOf
+
+# slices shorter than this are cheaper to copy than to keep a view of
+STRING_VIEW_MIN = 32
+# concatenations shorter than this are cheaper to join straight away
+STRING_ROPE_MIN = 64
+
+get_value = attrgetter("value")
+
 
 class ValueType:
+    shared: dict[str, "ValueType"] = {}
+
     def __init__(self, value_type: str) -> None:
         self.value_type = self.__parse_type(value_type)
 
+    @classmethod
+    def of(cls, value_type: str) -> "ValueType":
+        """one shared, validated instance per type name, values are created far too often to build their own"""
+        try:
+            return cls.shared[value_type]
+        except KeyError:
+            return cls.shared.setdefault(value_type, cls(value_type))
+
     def __parse_type(self, value_type: str) -> str:
         available_types = (
             'NULL',
@@ -12,7 +37,10 @@ class ValueType:
             'STRING',
             'BOOLEAN',
             'EXT_NAME',
-            'LIST'
+            'LIST',
+            'DICT',
+            'RANGE',
+            'OBJECT'
         )
         if value_type in available_types:
             return value_type
@@ -21,7 +49,7 @@ class ValueType:
 
 class RuntimeVal:
     def __init__(self, value_type: str, value=None, access_type='NORM') -> None:
-        self.value_type: ValueType = ValueType(value_type)
+        self.value_type: ValueType = ValueType.of(value_type)
         self.value = value
         self.access_type = access_type
 
@@ -71,36 +99,65 @@ class NumberVal(RuntimeVal):
         return str(self.value)
 
 class StringVal(RuntimeVal):
+    # value types that can index into this value
+    key_types = (NumberVal,)
+
+    # name in the language -> name of the python method, shared by every instance
+    attribute_set = {
+        "value": "get_value",
+        "length": "get_length",
+    }
+
+    method_set = {
+        "substring": "substring",
+        "left": "left",
+        "right": "right",
+        "upper": "upper",
+        "lower": "lower",
+        "split": "split",
+        "find": "find",
+        "count": "count",
+        "replace": "replace",
+        "contains": "contains",
+        "startsWith": "starts_with",
+        "endsWith": "ends_with",
+        "strip": "strip",
+        "splitLines": "split_lines",
+    }
+
     def __init__(self, value: str = '') -> None:
         super().__init__('STRING')
         self.value: str = value 
         self.length = len(self.value)
-        self.attribute_set = {
-            "value": self.value,
-            "length": lambda: self.get_length()
-        }
-
-        self.method_set = {
-            "substring": self.substring,
-            "left": self.left,
-            "right": self.right,
-            "upper": self.upper,
-            "lower": self.lower,
-            "split": self.split,
-        }
+
+    def get_value(self):
+        return self
 
     def get_length(self):
         return MK_NUMBER(self.length) 
 
+    def get_span(self) -> tuple[str, int]:
+        """returns the string holding the characters and the offset they start at"""
+        return self.value, 0
+
+    def view(self, start: int | None, stop: int | None) -> "StringVal":
+        """slice with python semantics, without copying unless the slice is short"""
+        start, stop, _ = slice(start, stop).indices(self.length)
+        stop = max(start, stop)
+        base, offset = self.get_span()
+        if stop - start < STRING_VIEW_MIN:
+            return MK_STRING(base[offset + start:offset + stop])
+        return StringView(base, offset + start, offset + stop)
+
     def substring(self, x, i):
         """returns i characters starting from x"""
-        return MK_STRING(self.value[x.value:x.value+i.value])
+        return self.view(x.value, x.value + i.value)
     
     def left(self, i):
-        return MK_STRING(self.value[:i.value])
+        return self.view(None, i.value)
     
     def right(self, i):
-        return MK_STRING(self.value[-i.value:])
+        return self.view(-i.value, None)
     
     def upper(self):
         return MK_STRING(self.value.upper())
@@ -111,9 +168,38 @@ class StringVal(RuntimeVal):
     def split(self, delimiter=None):
         if delimiter is None:
             delimiter = MK_STRING(" ")
-        if re.fullmatch(r"\\\\(?:[a-z]|\'|\"|\\)+", delimiter.value) is not None:
-            delimiter = MK_STRING(delimiter.value[1:])
-        return MK_LIST(repr(self.value)[1:-1].split(delimiter.value))
+        return ListVal(list(map(StringVal, self.value.split(delimiter.value))), boxed=True)
+
+    def split_lines(self):
+        return ListVal(list(map(StringVal, self.value.splitlines())), boxed=True)
+
+    def find(self, sub):
+        """index of the first occurrence of sub, -1 if there is none"""
+        base, offset = self.get_span()
+        index = base.find(sub.value, offset, offset + self.length)
+        return MK_NUMBER(index if index == -1 else index - offset)
+
+    def count(self, sub):
+        base, offset = self.get_span()
+        return MK_NUMBER(base.count(sub.value, offset, offset + self.length))
+
+    def contains(self, sub):
+        base, offset = self.get_span()
+        return MK_BOOL(base.find(sub.value, offset, offset + self.length) != -1)
+
+    def starts_with(self, prefix):
+        base, offset = self.get_span()
+        return MK_BOOL(base.startswith(prefix.value, offset, offset + self.length))
+
+    def ends_with(self, suffix):
+        base, offset = self.get_span()
+        return MK_BOOL(base.endswith(suffix.value, offset, offset + self.length))
+
+    def replace(self, old, new):
+        return MK_STRING(self.value.replace(old.value, new.value))
+
+    def strip(self):
+        return MK_STRING(self.value.strip())
     
     @staticmethod
     def ASC(char):
@@ -129,9 +215,20 @@ class StringVal(RuntimeVal):
         
 
         return MK_STRING(self.value[index])
+
+    def __iter__(self):
+        base, offset = self.get_span()
+        if offset == 0 and self.length == len(base):
+            return map(StringVal, base)
+        return map(StringVal, islice(base, offset, offset + self.length))
     
     def __add__(self, other):
-        return MK_STRING(self.value + other.value)
+        if not isinstance(other, StringVal):
+            raise TypeError(f"cannot concatenate string {self} and {other}")
+        length = self.length + other.length
+        if length < STRING_ROPE_MIN:
+            return MK_STRING(self.value + other.value)
+        return StringRope([self.value, other.value], 2, length)
     
     def __repr__(self) -> str:
         return repr(self.value)
@@ -140,6 +237,112 @@ class StringVal(RuntimeVal):
         return repr(self.value)
 
 
+class StringView(StringVal):
+    """
+    characters [start, stop) of a base string, the slice is only copied out
+    once .value is needed (printing, comparing, passing to a builtin)
+    """
+
+    def __init__(self, base: str, start: int, stop: int) -> None:
+        self.base = base
+        self.start = start
+        self.stop = stop
+        RuntimeVal.__init__(self, 'STRING')
+        self.length = stop - start
+
+    @property
+    def value(self) -> str:
+        if self.base is not None:
+            self._value = self.base[self.start:self.stop]
+            self.base = None # let go of the base string
+        return self._value
+
+    @value.setter
+    def value(self, value: str | None) -> None:
+        self._value = value
+        if value is not None:
+            self.base = None
+
+    def get_span(self) -> tuple[str, int]:
+        if self.base is None:
+            return self._value, 0
+        return self.base, self.start
+
+    def get_index(self, index: int) -> Any:
+        if index >= self.length or index < -self.length:
+            raise IndexError(f"INDEX IS TOO LARGE, INDEX = {index}, LENGTH = {self.length}")
+        if index < 0:
+            index += self.length
+        base, offset = self.get_span()
+        return MK_STRING(base[offset + index])
+
+
+class StringRope(StringVal):
+    """
+    result of concatenation: the first part_count pieces of parts, joined only once
+    .value is needed (indexing, printing, comparing, passing to a builtin).
+    ropes built from each other share one parts list, so s = s + x appends in O(1)
+    """
+
+    def __init__(self, parts: list[str], part_count: int, length: int) -> None:
+        self.parts = parts
+        self.part_count = part_count # not count, that is the string method
+        RuntimeVal.__init__(self, 'STRING')
+        self.length = length
+
+    @property
+    def value(self) -> str:
+        if self._value is None:
+            self._value = "".join(self.parts[:self.part_count])
+        return self._value
+
+    @value.setter
+    def value(self, value: str | None) -> None:
+        self._value = value
+
+    def __add__(self, other):
+        if not isinstance(other, StringVal):
+            raise TypeError(f"cannot concatenate string {self} and {other}")
+        parts = self.parts
+        if self.part_count != len(parts): # a sibling rope already extended parts
+            parts = parts[:self.part_count]
+        parts.append(other.value)
+        return StringRope(parts, self.part_count + 1, self.length + other.length)
+
+
+class MappedText(StringVal):
+    """
+    contents of a file as raw bytes (usually an mmap), only decoded once .value is needed.
+    split("\n") hands out the lines without decoding the rest of the file
+    """
+
+    def __init__(self, data) -> None:
+        self.data = data
+        RuntimeVal.__init__(self, 'STRING')
+
+    @property
+    def value(self) -> str:
+        if self._value is None:
+            self._value = str(self.data, "utf-8").replace("\r\n", "\n")
+        return self._value
+
+    @value.setter
+    def value(self, value: str | None) -> None:
+        self._value = value
+
+    @property
+    def length(self) -> int:
+        return len(self.value)
+
+    def split(self, delimiter=None):
+        if delimiter is not None and delimiter.value == "\n" and self._value is None:
+            import re
+            starts = array('q', [0])
+            starts.extend(match.end() for match in re.finditer(b"\n", self.data))
+            return MappedLines(self.data, starts)
+        return super().split(delimiter)
+
+
 class ExtName(RuntimeVal):
     def __init__(self, value: str = '') -> None:
         super().__init__('EXT_NAME')
@@ -158,66 +361,138 @@ class ObjectVal(RuntimeVal):
         return self.value.get_name()
 
 class ListVal(RuntimeVal):
-    def __init__(self, value: list[Any]=[]) -> None:
+    key_types = (NumberVal,)
+
+    attribute_set = {
+        "length": "get_length",
+    }
+
+    method_set = {
+        "append": "append",
+        "pop": "pop",
+        "insert": "insert",
+        "slice": "slice_",
+        "head": "head",
+        "tail": "tail",
+        "sort": "sort",
+        "sum": "sum_",
+        "min": "min_",
+        "max": "max_",
+        "count": "count",
+        "indexOf": "index_of",
+        "contains": "contains",
+        "toInt": "to_int",
+        "toFloat": "to_float",
+    }
+
+    def __init__(self, value: list[Any]=[], boxed: bool = False) -> None:
+        """boxed: every element of value is already a RuntimeVal, use the list as it is"""
         super().__init__('LIST')
-        self.value: list[Any] = self.create_list(value)
+        self.value: list[Any] = value if boxed else self.create_list(value)
         self.length = len(self.value)
-        self.attribute_set = {
-            "length": lambda: MK_NUMBER(self.get_length())
-        }
-        self.method_set = {
-            "append": self.append,
-            "pop": self.pop,
-            "insert": self.insert,
-            "slice": self.slice_,
-            "head": self.head,
-            "tail": self.tail,
-            "sort": self.sort
-        }
+        self.shared = False # True while a ListView may be looking at self.value
     
     def create_list(self, value) -> list[Any]:
         return list(map(lambda x: MK_VALUE(x) if not isinstance(x, RuntimeVal) else x, value))
     
-    def get_length(self) -> int:
-        return len(self.value)
+    def get_length(self) -> NumberVal:
+        return MK_NUMBER(self.length)
+
+    def get_span(self) -> tuple[list[Any], int]:
+        """returns the list holding the elements and the offset they start at"""
+        self.shared = True
+        return self.value, 0
+
+    def view(self, start: int | None, stop: int | None) -> "ListView":
+        """slice with python semantics, sharing the elements instead of copying them"""
+        start, stop, _ = slice(start, stop).indices(self.length)
+        stop = max(start, stop)
+        base, offset = self.get_span()
+        return ListView(base, offset + start, offset + stop)
+
+    def unshare(self) -> None:
+        """copy on write, called before any mutation"""
+        if self.shared:
+            self.value = self.value.copy()
+            self.shared = False
     
+    def __iter__(self):
+        return iter(self.value)
+
+    def python_values(self):
+        """iterator over the unboxed elements, for handing straight to python builtins"""
+        return map(get_value, self)
+
+    def sum_(self) -> NumberVal:
+        return MK_NUMBER(sum(self.python_values()))
+
+    def min_(self) -> RuntimeVal:
+        if self.length == 0:
+            raise ValueError("min of an empty list")
+        return min(self, key=get_value)
+
+    def max_(self) -> RuntimeVal:
+        if self.length == 0:
+            raise ValueError("max of an empty list")
+        return max(self, key=get_value)
+
+    def count(self, value) -> NumberVal:
+        return MK_NUMBER(countOf(self.python_values(), value.value))
+
+    def index_of(self, value) -> NumberVal:
+        """index of the first element equal to value, -1 if there is none"""
+        try:
+            return MK_NUMBER(indexOf(self.python_values(), value.value))
+        except ValueError:
+            return MK_NUMBER(-1)
+
+    def contains(self, value) -> BoolVal:
+        return MK_BOOL(value.value in self.python_values())
+
+    def to_int(self) -> "ListVal":
+        return ListVal(list(map(NumberVal, map(int, self.python_values()))), boxed=True)
+
+    def to_float(self) -> "ListVal":
+        return ListVal(list(map(NumberVal, map(float, self.python_values()))), boxed=True)
+
     def sort(self, reverse: BoolVal | None = None) -> None:
         if reverse is None:
             reverse = MK_BOOL(False)
+        self.unshare()
         self.value.sort(key=lambda x: x.value, reverse=reverse.value)
-
-        print(self.length)
-
-        
     
     def append(self, value: Any) -> Any:
+        self.unshare()
         self.value.append(value)
         self.length += 1
-        return MK_LIST(self.value)
+        return self
     
-    def pop(self, i=-1) -> Any:
+    def pop(self, i=None) -> Any:
+        self.unshare()
+        value = self.value.pop(-1 if i is None else i.value)
         self.length -= 1
-        return MK_VALUE(self.value.pop(i))
+        return value
     
     def insert(self, i, value) -> Any:
+        self.unshare()
+        self.value.insert(i.value, value)
         self.length += 1
-        self.value.insert(i, value)
-        return MK_LIST(self.value)
+        return self
     
     def slice_(self, start, n) -> Any:
         """returns n characters from start"""
-        return MK_LIST(self.value[start.value:start.value+n.value])
+        return self.view(start.value, start.value + n.value)
     
     def head(self, n=None) -> Any:
         if n is None:
-            return self.value[0]
-        return MK_LIST(self.value[:n.value])
+            return self.get_index(0)
+        return self.view(None, n.value)
     
     def tail(self, n=None) -> Any:
         """returns the rest of the array starting from n(inclusive)"""
         if n is None:
-            return MK_LIST(self.value[1:])
-        return MK_LIST(self.value[-n.value:])
+            return self.view(1, None)
+        return self.view(-n.value, None)
 
     def get_index(self, index: int) -> Any:
         if index >= self.length:
@@ -232,6 +507,7 @@ class ListVal(RuntimeVal):
         if index >= self.length:
             raise IndexError(f"INDEX IS TOO LARGE, INDEX = {index}, LENGTH = {self.length}")
         
+        self.unshare()
         self.value[index] = value
      
     def __str__(self) -> str:
@@ -252,9 +528,263 @@ class ListVal(RuntimeVal):
         return "LIST_VAL"
 
 
+class ListView(ListVal):
+    """
+    elements [start, stop) of another list's storage, copied out into a list
+    of its own on the first mutation or once .value escapes
+    """
+
+    def __init__(self, base: list[Any], start: int, stop: int) -> None:
+        self.base = base
+        self.start = start
+        self.stop = stop
+        RuntimeVal.__init__(self, 'LIST')
+        self.length = stop - start
+        self.shared = False
+
+    @property
+    def value(self) -> list[Any]:
+        if self.base is not None:
+            self._value = self.base[self.start:self.stop]
+            self.base = None # let go of the base list
+        return self._value
+
+    @value.setter
+    def value(self, value: list[Any] | None) -> None:
+        self._value = value
+        if value is not None:
+            self.base = None
+
+    def get_span(self) -> tuple[list[Any], int]:
+        if self.base is None:
+            return super().get_span()
+        return self.base, self.start
+
+    def __iter__(self):
+        if self.base is None:
+            return iter(self._value)
+        return islice(self.base, self.start, self.stop)
+
+    def get_index(self, index: int) -> Any:
+        if self.base is None:
+            return super().get_index(index)
+        if index >= self.length or index < -self.length:
+            raise IndexError(f"INDEX IS TOO LARGE, INDEX = {index}, LENGTH = {self.length}")
+        if index < 0:
+            index += self.length
+        return self.base[self.start + index]
+
+
+class MappedLines(ListVal):
+    """
+    lines of a MappedText, as str.split("\n") gives them: only where each line starts is kept,
+    a line is decoded when it is used and the list itself is only built once .value is needed
+    """
+
+    def __init__(self, data, starts: array) -> None:
+        self.data = data
+        self.starts = starts
+        RuntimeVal.__init__(self, 'LIST')
+        self.length = len(starts)
+        self.shared = False
+
+    @property
+    def value(self) -> list[Any]:
+        if self._value is None:
+            self._value = list(map(self.line, range(self.length)))
+            self.data = self.starts = None
+        return self._value
+
+    @value.setter
+    def value(self, value: list[Any] | None) -> None:
+        self._value = value
+
+    def line(self, index: int) -> StringVal:
+        start = self.starts[index]
+        if index + 1 < self.length:
+            stop = self.starts[index + 1] - 1
+            if stop > start and self.data[stop - 1] == 13: # \r\n
+                stop -= 1
+        else:
+            stop = len(self.data)
+        return StringVal(str(self.data[start:stop], "utf-8"))
+
+    def __iter__(self):
+        if self._value is not None:
+            return iter(self._value)
+        return map(self.line, range(self.length))
+
+    def get_index(self, index: int) -> Any:
+        if self._value is not None:
+            return super().get_index(index)
+        if index >= self.length or index < -self.length:
+            raise IndexError(f"INDEX IS TOO LARGE, INDEX = {index}, LENGTH = {self.length}")
+        if index < 0:
+            index += self.length
+        return self.line(index)
+
+
+class NumberArray(ListVal):
+    """
+    numbers held unboxed in an array ('q' for whole numbers, 'd' otherwise, or a list of python
+    numbers when they do not fit either), each is boxed as it is used and the list of NumberVals
+    is only built once .value is needed
+    """
+
+    def __init__(self, numbers: array | list) -> None:
+        self.numbers = numbers
+        RuntimeVal.__init__(self, 'LIST')
+        self.length = len(numbers)
+        self.shared = False
+
+    @property
+    def value(self) -> list[Any]:
+        if self._value is None:
+            self._value = list(map(NumberVal, self.numbers))
+            self.numbers = None
+        return self._value
+
+    @value.setter
+    def value(self, value: list[Any] | None) -> None:
+        self._value = value
+
+    def __iter__(self):
+        if self._value is not None:
+            return iter(self._value)
+        return map(NumberVal, self.numbers)
+
+    def python_values(self):
+        if self._value is not None:
+            return super().python_values()
+        return iter(self.numbers)
+
+    def get_index(self, index: int) -> Any:
+        if self._value is not None:
+            return super().get_index(index)
+        if index >= self.length or index < -self.length:
+            raise IndexError(f"INDEX IS TOO LARGE, INDEX = {index}, LENGTH = {self.length}")
+        return NumberVal(self.numbers[index])
+
+    def min_(self) -> RuntimeVal:
+        if self._value is not None or self.length == 0:
+            return super().min_()
+        return NumberVal(min(self.numbers))
+
+    def max_(self) -> RuntimeVal:
+        if self._value is not None or self.length == 0:
+            return super().max_()
+        return NumberVal(max(self.numbers))
+
+    def sort(self, reverse: BoolVal | None = None) -> None:
+        if self._value is not None:
+            return super().sort(reverse)
+        numbers = sorted(self.numbers, reverse=reverse is not None and reverse.value)
+        self.numbers = array(self.numbers.typecode, numbers) if type(self.numbers) is array else numbers
+
+
+class DictVal(RuntimeVal):
+    """hash map, keyed on the python value of numbers, strings and booleans"""
+    key_types = (NumberVal, StringVal, BoolVal)
+
+    attribute_set = {
+        "length": "get_length",
+    }
+
+    method_set = {
+        "keys": "keys",
+        "values": "values",
+        "contains": "contains",
+        "remove": "remove",
+    }
+
+    def __init__(self, value: dict | None = None) -> None:
+        super().__init__('DICT')
+        self.value: dict[Any, RuntimeVal] = value if value is not None else {}
+
+    @property
+    def length(self) -> int:
+        return len(self.value)
+
+    def get_length(self) -> NumberVal:
+        return MK_NUMBER(len(self.value))
+
+    def keys(self) -> ListVal:
+        return MK_LIST(list(self.value))
+
+    def values(self) -> ListVal:
+        return MK_LIST(list(self.value.values()))
+
+    def contains(self, key) -> BoolVal:
+        return MK_BOOL(self.hash_key(key) in self.value)
+
+    def remove(self, key) -> RuntimeVal:
+        try:
+            return self.value.pop(self.hash_key(key))
+        except KeyError:
+            raise KeyError(f"KEY NOT FOUND, KEY = {key}") from None
+
+    def hash_key(self, key: RuntimeVal) -> Any:
+        if not isinstance(key, self.key_types):
+            raise TypeError(f"INVALID KEY: {key} cannot be used as a dictionary key")
+        return key.value
+
+    def __iter__(self):
+        return map(MK_VALUE, self.value)
+
+    def get_index(self, key: Any) -> RuntimeVal:
+        try:
+            return self.value[key]
+        except KeyError:
+            raise KeyError(f"KEY NOT FOUND, KEY = {key!r}") from None
+
+    def set_index(self, key: Any, value: RuntimeVal) -> None:
+        self.value[key] = value
+
+    def __str__(self) -> str:
+        s = "{"
+        for key, value in self.value.items():
+            s += f"{key!r}:{value},"
+        s += "}"
+        return s
+
+    def get_type(self) -> str:
+        return "DICT_VAL"
+
+
+class RangeVal(RuntimeVal):
+    """range(start, stop, step), numbers are only boxed as they are used"""
+    key_types = (NumberVal,)
+
+    attribute_set = {
+        "length": "get_length",
+    }
+
+    def __init__(self, value: range) -> None:
+        super().__init__('RANGE')
+        self.value: range = value
+        self.length = len(value)
+
+    def get_length(self) -> NumberVal:
+        return MK_NUMBER(self.length)
+
+    def get_index(self, index: int) -> NumberVal:
+        if index >= self.length:
+            raise IndexError(f"INDEX IS TOO LARGE, INDEX = {index}, LENGTH = {self.length}")
+        return MK_NUMBER(self.value[index])
+
+    def __iter__(self):
+        return map(NumberVal, self.value)
+
+    def __str__(self) -> str:
+        return str(self.value)
+
+    def get_type(self) -> str:
+        return "RANGE_VAL"
+
+
 def MK_VALUE(value) -> RuntimeVal:
     value_type = type(value)
-    if value_type == int:
+    if value_type == int or value_type == float:
         return MK_NUMBER(value)
     elif value_type == str:
         return MK_STRING(value)
@@ -268,6 +798,9 @@ def MK_VALUE(value) -> RuntimeVal:
 def MK_LIST(value: list[Any]=[]) -> ListVal:
     return ListVal(value)
 
+def MK_DICT(value: dict | None = None) -> DictVal:
+    return DictVal(value)
+
 def MK_NUMBER(value: int | float = 0) -> NumberVal:
     return NumberVal(value)
 
@@ -285,7 +818,7 @@ def MK_STRING(value: str = '') -> StringVal:
 
 
 def is_iterable(value: RuntimeVal) -> bool:
-    return 'get_index' in dir(value)
+    return hasattr(value, 'get_index')
 
 def is_mutable_iterable(value: RuntimeVal) -> bool:
-    return 'set_index' in dir(value)
\ No newline at end of file
+    return hasattr(value, 'set_index')
\ No newline at end of file
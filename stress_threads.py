@@ -0,0 +1,66 @@
+"""
+one parsed program evaluated by many threads at once: every thread runs it ROUNDS times on
+fresh environments, with its own step for the counted loop, and every result has to match
+a single-threaded run on a program parsed separately.
+usage: python stress_threads.py [threads]
+"""
+import sys
+import threading
+import time
+
+import interpreter
+
+ROUNDS = 5
+STEPS = (1, 2, 3)
+SOURCE = '''function fib(n)
+    r = n
+    if n > 1 then
+        r = fib(n - 1) + fib(n - 2)
+    elseif n == 1 then
+        r = 1
+    else
+        r = 0
+    endif
+return r
+endfunction
+total = 0
+for i = 0 to 12 step k
+    total = total + fib(i)
+next i
+for j = 10 to 0 step 0 - 1
+    total = total + j
+next j
+total'''
+
+
+def evaluate(program: interpreter.Program, step: int):
+    env = interpreter.setup_env()
+    env.declare_var('k', interpreter.MK_NUMBER(step))
+    return interpreter.evaluate(program, env).value
+
+
+def main(count: int) -> int:
+    expected = {step: evaluate(interpreter.Parser().produce_ast(SOURCE), step) for step in STEPS}
+
+    program = interpreter.Parser().produce_ast(SOURCE) # shared by every thread
+    results: dict[int, list] = {}
+
+    def worker(n: int) -> None:
+        results[n] = [evaluate(program, STEPS[n % len(STEPS)]) for _ in range(ROUNDS)]
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(count)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    end = time.perf_counter()
+
+    mismatches = [n for n in range(count) if results.get(n) != [expected[STEPS[n % len(STEPS)]]] * ROUNDS]
+    print(f"{count} threads x {ROUNDS} runs of one program: {end - start:.2f}s, "
+          f"expected {expected}, mismatches {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 24))
@@ -0,0 +1,39 @@
+"""python -m unittest discover tests (or pytest)"""
+from array import array
+import unittest
+
+import interpreter
+
+
+def run(source: str) -> str:
+    """everything the program prints"""
+    streams = interpreter.Streams(capture=True, input_lines=[])
+    interpreter.evaluate(interpreter.Parser().produce_ast(source), interpreter.setup_env(streams))
+    return streams.getvalue()
+
+
+class ConstTest(unittest.TestCase):
+    def test_reassigning_const_fails(self):
+        with self.assertRaisesRegex(ValueError, "constant"):
+            run('const c = 1\nc = 2')
+
+    def test_const_alias_shares_the_list(self):
+        source = 'ys = [1, 2]\nconst c = ys\nc.append(3)\nprint(ys.length, c.length)\nprint(ys[2])\nys = 0\nprint(ys)'
+        self.assertEqual(run(source), "3 3\n3\n0\n")
+
+    def test_const_alias_shares_the_table_column(self):
+        column = interpreter.NumberArray(array('q', [1, 2]))
+        streams = interpreter.Streams(capture=True, input_lines=[])
+        env = interpreter.setup_env(streams)
+        env.declare_var('xs', column)
+        program = 'const c = xs\nc.append(3)\nprint(xs.length, c.length, xs[2], c.max())'
+        interpreter.evaluate(interpreter.Parser().produce_ast(program), env)
+        self.assertEqual(streams.getvalue(), "3 3 3 3\n")
+
+    def test_const_builtin_value_stays_usable(self):
+        run('const t = true\nconst n = None')
+        self.assertEqual(run('y = true\ny = false\nz = None\nz = 1\nprint(y, z)'), "False 1\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+"""python -m unittest discover tests (or pytest)"""
+import unittest
+
+import interpreter
+
+
+def run(source: str, memo: interpreter.Memoizer | None = None) -> str:
+    """everything the program prints"""
+    streams = interpreter.Streams(capture=True, input_lines=[])
+    env = interpreter.setup_env(streams)
+    env.memo = memo
+    interpreter.evaluate(interpreter.Parser().produce_ast(source), env)
+    return streams.getvalue()
+
+
+class MemoKeyTest(unittest.TestCase):
+    SOURCE = 'function f(x)\n    return str(x)\nendfunction\nprint(f(2 / 2))\nprint(f(1))\nprint(f(true))\nprint(f(1))'
+
+    def test_equal_numbers_of_other_types_are_separate_entries(self):
+        memo = interpreter.Memoizer(interpreter.DEFAULT_MEMO_SIZE, None)
+        self.assertEqual(run(self.SOURCE, memo), run(self.SOURCE))
+        self.assertEqual(run(self.SOURCE), "'1.0'\n'1'\n'True'\n'1'\n")
+        table, = memo.tables.values()
+        self.assertEqual((table.hits, table.misses), (1, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
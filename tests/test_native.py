@@ -0,0 +1,34 @@
+"""python -m unittest discover tests (or pytest)"""
+import unittest
+
+import interpreter
+from interpreter.native import UNBOXERS
+
+
+class NativeArgumentTest(unittest.TestCase):
+    def test_list_argument_is_a_view(self):
+        numbers = interpreter.MK_LIST([interpreter.MK_NUMBER(n) for n in (3, 1, 2)])
+        view = UNBOXERS["list"](numbers)
+        self.assertEqual((len(view), view[0], view[-1], list(view), sorted(view)), (3, 3, 2, [3, 1, 2], [1, 2, 3]))
+        numbers.append(interpreter.MK_NUMBER(7)) # nothing was copied, the view follows the list
+        self.assertEqual(list(view), [3, 1, 2, 7])
+        with self.assertRaises(IndexError):
+            view[4]
+
+    def test_dict_argument_is_a_view(self):
+        table = interpreter.MK_DICT()
+        table.set_index("a", interpreter.MK_NUMBER(2))
+        view = UNBOXERS["dict"](table)
+        self.assertEqual(dict(view), {"a": 2})
+        with self.assertRaises(TypeError):
+            view["b"] = 1
+
+    def test_unknown_types_are_rejected(self):
+        with self.assertRaisesRegex(TypeError, "unknown parameter type null"):
+            interpreter.register_native("f", len, ("null",))
+        with self.assertRaisesRegex(TypeError, "unknown return type dict"):
+            interpreter.register_native("f", len, ("list",), returns="dict")
+
+
+if __name__ == "__main__":
+    unittest.main()
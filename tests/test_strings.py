@@ -0,0 +1,32 @@
+"""python -m unittest discover tests (or pytest)"""
+import unittest
+
+import interpreter
+
+
+def run(source: str) -> str:
+    """everything the program prints"""
+    streams = interpreter.Streams(capture=True, input_lines=[])
+    interpreter.evaluate(interpreter.Parser().produce_ast(source), interpreter.setup_env(streams))
+    return streams.getvalue()
+
+
+class ConcatenatedStringTest(unittest.TestCase):
+    def test_count_on_rope(self):
+        source = 's = ""\nfor i = 0 to 40\n    s = s + "ab"\nnext i\nprint(s.count("a"), s.count("ba"))'
+        self.assertEqual(run(source), "40 39\n")
+
+    def test_count_method_of_rope_value(self):
+        # long enough to be joined lazily, see STRING_ROPE_MIN
+        rope = interpreter.MK_STRING("banana" * 20) + interpreter.MK_STRING("bandana" * 20)
+        self.assertIsInstance(rope, interpreter.StringRope)
+        self.assertEqual(rope.count(interpreter.MK_STRING("an")).value, 80)
+
+    def test_count_on_rope_sharing_parts(self):
+        source = ('a = ""\nfor i = 0 to 40\n    a = a + "xy"\nnext i\n'
+                  'b = a + "x"\nc = a + "y"\nprint(b.count("x"), c.count("x"), c.count("y"))')
+        self.assertEqual(run(source), "41 40 41\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
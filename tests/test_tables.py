@@ -0,0 +1,26 @@
+"""python -m unittest discover tests (or pytest)"""
+import os
+import tempfile
+import unittest
+
+import interpreter
+from interpreter.default_modules import read_table
+
+
+class ReadTableTest(unittest.TestCase):
+    def read(self, text: str) -> list:
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write(text)
+        self.addCleanup(os.remove, f.name)
+        return [list(column.python_values()) for column in read_table(interpreter.MK_STRING(f.name))]
+
+    def test_whole_numbers_beyond_64_bits_stay_exact(self):
+        self.assertEqual(self.read("1 2.5\n12345678901234567890 3\n7 4\n"),
+                         [[1, 12345678901234567890, 7], [2.5, 3.0, 4.0]])
+
+    def test_floats_after_a_big_number(self):
+        self.assertEqual(self.read("99999999999999999999\n0.5\n"), [[99999999999999999999, 0.5]])
+
+
+if __name__ == "__main__":
+    unittest.main()